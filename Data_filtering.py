@@ -1,7 +1,29 @@
 import pandas as pd
+import numpy as np
 import os
+import argparse
+import asyncio
+import glob
+import io
+import hashlib
+import json
+import queue
+import re
+import shutil
+import tempfile
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from functools import partial
 from pathlib import Path
 
+try:
+    import pyarrow as pa
+    import pyarrow.compute as pc
+    import pyarrow.csv as pa_csv
+    import pyarrow.ipc as pa_ipc
+    import pyarrow.parquet as pq
+except ImportError:  # pyarrow is optional; only the columnar output needs it
+    pa = None
+
 
 def parse_price(price_str):
     if isinstance(price_str, str):
@@ -9,65 +31,1128 @@ def parse_price(price_str):
     return float(price_str)
 
 
-def process_sales_data(input_files, output_file='pink_morsel_sales.csv'):
+def parse_prices(prices, errors='raise'):
+    """
+    Vectorized parse_price for a whole Series of prices.
+
+    Prices are factorized first, so each distinct value (a handful per product)
+    is parsed once and broadcast back to the rows. Accepts '$'-prefixed strings
+    and already numeric values; missing values stay NaN. Malformed entries raise
+    a ValueError listing them, or become NaN with a warning if errors='coerce'.
+    """
+    if errors not in ('raise', 'coerce'):
+        raise ValueError(f"errors must be 'raise' or 'coerce', got {errors!r}")
+
+    if pd.api.types.is_numeric_dtype(prices):
+        return prices.astype(float)
+
+    codes, uniques = pd.factorize(prices)
+    text = pd.Series(uniques, dtype=object).astype('string').str.strip().str.lstrip('$')
+    parsed = pd.to_numeric(text, errors='coerce').astype(float).to_numpy()
+
+    malformed = np.isnan(parsed)
+    if malformed.any():
+        bad_count = int(np.isin(codes, np.flatnonzero(malformed)).sum())
+        examples = list(pd.Series(uniques, dtype=object)[malformed][:5])
+        message = f"{bad_count} malformed price value(s), e.g. {examples}"
+        if errors == 'raise':
+            raise ValueError(message)
+        print(f"Warning: {message}. Treating them as missing.")
+
+    values = np.where(codes < 0, np.nan, parsed[codes])
+    return pd.Series(values, index=prices.index, name=prices.name)
+
+
+# Declared layout of the raw daily sales files. Only these columns are read;
+# low-cardinality text is read as categoricals and dates are parsed on the way in.
+RAW_SALES_COLUMNS = ['product', 'price', 'quantity', 'date', 'region']
+RAW_SALES_DTYPES = {'product': 'category', 'price': 'category', 'quantity': 'float64', 'region': 'category'}
+RAW_DATE_FORMAT = '%Y-%m-%d'
+
+
+def read_raw_infer(source):
+    """pandas with type inference: every text column as strings, dates included."""
+    return pd.read_csv(source)
+
+
+def read_raw_pandas(source, chunksize=None):
+    """The pandas C engine reading the declared schema (in chunks if chunksize is set)."""
+    return pd.read_csv(source, usecols=RAW_SALES_COLUMNS, dtype=RAW_SALES_DTYPES,
+                       parse_dates=['date'], date_format=RAW_DATE_FORMAT, engine='c',
+                       chunksize=chunksize)
+
+
+def raw_arrow_convert_options():
+    """pyarrow CSV conversion options for the declared raw sales schema."""
+    if pa is None:
+        raise ImportError("pyarrow is required for the pyarrow CSV backend")
+
+    text = pa.dictionary(pa.int32(), pa.string())
+    return pa_csv.ConvertOptions(
+        include_columns=RAW_SALES_COLUMNS,
+        column_types={'product': text, 'price': text, 'quantity': pa.float64(),
+                      'date': pa.timestamp('us'), 'region': text},
+    )
+
+
+def read_raw_pyarrow(source):
+    """The multi-threaded pyarrow CSV reader with the declared schema."""
+    convert_options = raw_arrow_convert_options()
+    return pa_csv.read_csv(source, convert_options=convert_options).to_pandas()
+
+
+# Parsers for raw daily sales files, selectable with --csv-backend
+CSV_BACKENDS = {
+    'infer': read_raw_infer,
+    'pandas': read_raw_pandas,
+    'pyarrow': read_raw_pyarrow,
+}
+# pyarrow is fastest when installed; the typed pandas reader otherwise
+RAW_CSV_BACKEND = 'pyarrow' if pa is not None else 'pandas'
+
+
+def read_raw_sales(source, backend=RAW_CSV_BACKEND):
+    """Read a raw daily sales file (a path or file object) with a backend from CSV_BACKENDS."""
+    if backend not in CSV_BACKENDS:
+        raise ValueError(f"Unknown CSV backend: {backend!r}")
+    return CSV_BACKENDS[backend](source)
+
+
+def read_raw_sales_chunks(source, chunksize, backend=RAW_CSV_BACKEND):
+    """
+    Yield a raw daily sales file as frames of at most `chunksize` rows, parsed
+    like read_raw_sales with the given backend.
+    """
+    if backend not in CSV_BACKENDS:
+        raise ValueError(f"Unknown CSV backend: {backend!r}")
+    if backend == 'infer':
+        yield from pd.read_csv(source, chunksize=chunksize)
+    elif backend == 'pandas':
+        yield from read_raw_pandas(source, chunksize=chunksize)
+    else:
+        if pa is None:
+            raise ImportError("pyarrow is required for the pyarrow CSV backend")
+        reader = pa_csv.open_csv(source, convert_options=raw_arrow_convert_options())
+        for batch in reader:
+            for start in range(0, batch.num_rows, chunksize):
+                yield batch.slice(start, chunksize).to_pandas()
+
+
+PREFILTER_BLOCK_SIZE = 1 << 20
+
+
+def iter_line_blocks(stream, block_size=PREFILTER_BLOCK_SIZE):
+    """Yield the lines of a binary stream as lists, reading block_size bytes at a time."""
+    tail = b''
+    while True:
+        block = stream.read(block_size)
+        if not block:
+            break
+        lines = (tail + block).split(b'\n')
+        tail = lines.pop()
+        yield lines
+    if tail:
+        yield [tail]
+
+
+def leads_with_product(header):
+    """True if a raw CSV header line starts with the product column."""
+    return header.partition(b',')[0].strip().strip(b'"').lower() == b'product'
+
+
+def prefilter_product_lines(header, stream, products):
+    """
+    Keep the header and the lines of a raw CSV byte stream (positioned after
+    the header) whose leading product field normalizes to one of `products`,
+    without parsing the other fields.
+
+    The stream is read in blocks and each distinct product value is
+    normalized once. Returns the kept bytes, the number of data rows and the
+    distinct raw product values. Assumes one record per line, as in the raw
+    daily sales files.
+    """
+    header = header.rstrip(b'\n')
+    rows = 0
+    decisions = {}
+    kept = [header]
+    for lines in iter_line_blocks(stream):
+        rows += len(lines) - lines.count(b'') - lines.count(b'\r')
+        for line in lines:
+            field = line.partition(b',')[0]
+            keep = decisions.get(field)
+            if keep is None:
+                keep = decisions[field] = field.decode().strip().strip('"').strip().lower() in products
+            if keep:
+                kept.append(line)
+
+    seen = [field.decode().strip('"') for field in decisions if field.strip()]
+    return b'\n'.join(kept), rows, seen
+
+
+def read_pyarrow_product_rows(source, products):
+    """
+    Stream a raw sales file through pyarrow and drop the rows of other
+    products from each parsed block before it reaches pandas.
+    """
+    if pa is None:
+        raise ImportError("pyarrow is required for the pyarrow CSV backend")
+    reader = pa_csv.open_csv(source, convert_options=raw_arrow_convert_options())
+    wanted = pa.array(products, pa.string())
+    batches, rows, seen = [], 0, {}
+    for batch in reader:
+        rows += batch.num_rows
+        product = batch.column('product')
+        seen.update(dict.fromkeys(value for value in product.dictionary.to_pylist() if value))
+        # Match each distinct product once, then expand to rows through the dictionary indices
+        matches = pc.is_in(pc.utf8_lower(pc.utf8_trim_whitespace(product.dictionary)), value_set=wanted)
+        batches.append(batch.filter(pc.take(matches, product.indices)))
+    table = pa.Table.from_batches(batches, schema=reader.schema)
+    return table.to_pandas(), rows, list(seen)
+
+
+def read_raw_product_rows(source, products, backend=RAW_CSV_BACKEND):
+    """
+    Read only the rows of the given lower-case products from a raw daily sales
+    file, filtering while parsing so other products never become pandas
+    objects.
+
+    The pyarrow backend filters each parsed block; the pandas backends parse
+    only the lines prefilter_product_lines keeps. Returns the frame with the
+    file's row count and the distinct raw product values, for the summary.
+    """
+    if backend not in CSV_BACKENDS:
+        raise ValueError(f"Unknown CSV backend: {backend!r}")
+    if backend == 'pyarrow':
+        return read_pyarrow_product_rows(source, products)
+
+    stream = source if hasattr(source, 'read') else open(source, 'rb')
+    try:
+        header = stream.readline()
+        if not leads_with_product(header):
+            # Parse the whole file; the stream may not be seekable, so rejoin the header
+            df = read_raw_sales(io.BytesIO(header + stream.read()), backend)
+            return df, len(df), list(df['product'].unique())
+        kept, rows, seen = prefilter_product_lines(header, stream, products)
+    finally:
+        if stream is not source:
+            stream.close()
+    return read_raw_sales(io.BytesIO(kept), backend), rows, seen
+
+
+# Products kept by the default (Pink Morsel only) runs
+PINK_MORSEL = ['pink morsel']
+
+# Directory of per-product consolidated files written by process_product_sales
+PRODUCT_SALES_DIR = 'product_sales'
+
+
+def normalize_labels(values):
+    """
+    Strip and lower-case text labels. Categorical columns are normalized once
+    per category; the result is a plain string column either way.
+    """
+    if isinstance(values.dtype, pd.CategoricalDtype):
+        categories = values.cat.categories.astype('str').str.strip().str.lower()
+        codes = values.cat.codes.to_numpy()
+        labels = categories.take(codes, allow_fill=True, fill_value=np.nan)
+        return pd.Series(labels, index=values.index, name=values.name)
+    return values.str.strip().str.lower().astype('str')
+
+
+def extract_sales(df, products=None):
+    """
+    Keep complete rows of the given lower-case products (every product if
+    None) and compute Sales, in the output layout plus a Product column.
+    """
+    product = normalize_labels(df['product'])
+    sales_df = df.assign(product=product)
+    if products is not None:
+        sales_df = sales_df[product.isin(products)]
+    sales_df = sales_df.dropna(subset=['price', 'quantity', 'date', 'region']).copy()
+
+    sales_df['price_numeric'] = parse_prices(sales_df['price'])
+    sales_df['Sales'] = sales_df['price_numeric'] * sales_df['quantity']
+
+    # Normalize region names once here so readers never need to
+    sales_df['region'] = normalize_labels(sales_df['region'])
 
-    all_data = []
+    output_df = sales_df[['Sales', 'date', 'region', 'product']].copy()
+    output_df.rename(columns={'date': 'Date', 'region': 'Region', 'product': 'Product'}, inplace=True)
+    return output_df
+
+
+def filter_pink_morsel(df):
+    """Keep complete Pink Morsel rows and compute Sales in the output layout."""
+    return extract_sales(df, PINK_MORSEL).drop(columns='Product')
+
+
+def product_file(product, output_dir=PRODUCT_SALES_DIR):
+    """Path of a product's consolidated file, e.g. product_sales/pink_morsel.csv."""
+    return Path(output_dir) / f"{product.replace(' ', '_')}.csv"
+
+
+def list_products(output_dir=PRODUCT_SALES_DIR):
+    """Products with a consolidated file in output_dir, sorted by name."""
+    if not os.path.isdir(output_dir):
+        return []
+    return sorted(path.stem.replace('_', ' ') for path in Path(output_dir).glob('*.csv'))
+
+
+def process_sales_frame(df, all_products=False):
+    """
+    Return the Pink Morsel rows of one raw daily sales frame (the rows of every
+    product, with a Product column, if all_products) along with the raw row
+    count and the products seen, for the combined summary.
+    """
+    filtered = extract_sales(df) if all_products else filter_pink_morsel(df)
+    return filtered, len(df), list(df['product'].unique())
+
+
+def process_sales_file(file_path, all_products=False, backend=RAW_CSV_BACKEND):
+    """
+    Read one daily sales file (a path or file object) and return what
+    process_sales_frame would. Unless all_products, only Pink Morsel rows are
+    materialized.
+    """
+    if all_products:
+        return process_sales_frame(read_raw_sales(file_path, backend), all_products)
+    df, row_count, products = read_raw_product_rows(file_path, PINK_MORSEL, backend)
+    return filter_pink_morsel(df), row_count, products
+
+
+def find_input_files(input_files):
+    """Return the input files that exist, warning about the missing ones."""
+    existing_files = []
     for file_path in input_files:
         if not os.path.exists(file_path):
             print(f"Warning: File {file_path} not found. Skipping...")
             continue
+        existing_files.append(file_path)
 
-        df = pd.read_csv(file_path)
-        all_data.append(df)
-
-    if not all_data:
+    if not existing_files:
         raise FileNotFoundError("No valid input files found!")
+    return existing_files
+
+
+def process_sales_files(file_paths, workers=1, all_products=False, backend=RAW_CSV_BACKEND):
+    """Run process_sales_file over file_paths, in a process pool if workers != 1."""
+    process = partial(process_sales_file, all_products=all_products, backend=backend)
+    if workers is None or workers > 1:
+        with ProcessPoolExecutor(max_workers=workers) as executor:
+            return list(executor.map(process, file_paths))
+    return [process(file_path) for file_path in file_paths]
+
+
+# Daily sales shards picked up by --input-glob by default
+INPUT_GLOB = 'data/daily_sales_data_*.csv'
+
+# Raw files consolidated by default, and the Pink Morsel file the dashboards read
+RAW_INPUT_FILES = [
+    'data/daily_sales_data_0.csv',
+    'data/daily_sales_data_1.csv',
+    'data/daily_sales_data_2.csv'
+]
+CONSOLIDATED_FILE = 'pink_morsel_sales_consolidated.csv'
+
+
+def natural_sort_key(path):
+    """Sort key comparing the runs of digits in a path as numbers, so shard _2 sorts before _10."""
+    return [int(part) if part.isdigit() else part for part in re.split(r'(\d+)', path)]
+
+
+def discover_input_files(pattern=INPUT_GLOB):
+    """Input shards matching a glob pattern, in natural (numeric-aware) order."""
+    files = sorted(glob.glob(pattern), key=natural_sort_key)
+    if not files:
+        raise FileNotFoundError(f"No input files match {pattern}")
+    return files
+
 
+# Blocks of PREFILTER_BLOCK_SIZE bytes held per file while its parser catches up
+ASYNC_QUEUED_BLOCKS = 4
 
-    combined_df = pd.concat(all_data, ignore_index=True)
-    print(f"\nCombined dataset: {len(combined_df)} total rows")
 
+def open_input(file_path):
+    """Open a raw input file for reading in blocks (the point to add latency in benchmarks)."""
+    return open(file_path, 'rb')
 
-    unique_products = combined_df['product'].unique()
-    print(f"Products found: {list(unique_products)}")
 
+class QueuedBlockReader(io.RawIOBase):
+    """
+    A readable stream over byte blocks that another thread puts on a queue;
+    None ends the stream. Lets a parser consume a file while it is still
+    being read.
+    """
 
-    pink_morsel_df = combined_df[
-        combined_df['product'].str.lower() == 'pink morsel'
-        ].copy()
+    def __init__(self, blocks):
+        self._blocks = blocks
+        self._pending = memoryview(b'')
+        self._finished = False
 
+    def readable(self):
+        return True
 
-    if len(pink_morsel_df) == 0:
+    def readinto(self, buffer):
+        while not self._pending and not self._finished:
+            block = self._blocks.get()
+            if block is None:
+                self._finished = True
+            else:
+                self._pending = memoryview(block)
+        size = min(len(buffer), len(self._pending))
+        buffer[:size] = self._pending[:size]
+        self._pending = self._pending[size:]
+        return size
+
+
+async def process_sales_files_async(file_paths, concurrency=16, all_products=False,
+                                    backend=RAW_CSV_BACKEND):
+    """
+    Read file_paths concurrently, at most `concurrency` at a time, and run
+    process_sales_file on each one while it is read: blocks of
+    PREFILTER_BLOCK_SIZE bytes are fed to a parser thread as they arrive, so
+    parsing overlaps with the reads still in flight. At most
+    ASYNC_QUEUED_BLOCKS blocks per file wait for their parser, so memory stays
+    bounded when parsing is slower than reading. Results come back in input
+    order, with None for missing files.
+    """
+    semaphore = asyncio.Semaphore(concurrency)
+    loop = asyncio.get_running_loop()
+
+    async def load(file_path, parsers):
+        async with semaphore:
+            try:
+                stream = await asyncio.to_thread(open_input, file_path)
+            except FileNotFoundError:
+                print(f"Warning: File {file_path} not found. Skipping...")
+                return None
+
+            blocks = queue.Queue(maxsize=ASYNC_QUEUED_BLOCKS)
+            parsing = loop.run_in_executor(parsers, process_sales_file,
+                                           io.BufferedReader(QueuedBlockReader(blocks)),
+                                           all_products, backend)
+
+            async def feed(block):
+                # Wait off the event loop for room in the queue, unless the parser has failed
+                while not parsing.done():
+                    try:
+                        return await asyncio.to_thread(blocks.put, block, timeout=0.1)
+                    except queue.Full:
+                        continue
+
+            try:
+                with stream:
+                    while block := await asyncio.to_thread(stream.read, PREFILTER_BLOCK_SIZE):
+                        await feed(block)
+                        if parsing.done():
+                            break
+            finally:
+                await feed(None)
+            return await parsing
+
+    # Parsers wait on their reads, so they get their own threads rather than the default pool's
+    with ThreadPoolExecutor(max_workers=concurrency) as parsers:
+        return await asyncio.gather(*(load(file_path, parsers) for file_path in file_paths))
+
+
+def process_sales_data_async(input_files=None, output_file='pink_morsel_sales.csv',
+                             pattern=INPUT_GLOB, concurrency=16, backend=RAW_CSV_BACKEND):
+    """
+    Consolidate Pink Morsel sales like process_sales_data, reading the input
+    files (or the shards matching pattern) concurrently. Meant for storage
+    where per-file latency dominates, e.g. network mounts; the output is
+    identical to the serial path.
+    """
+    file_paths = input_files or discover_input_files(pattern)
+    return process_sales_data(file_paths, output_file, backend=backend, concurrency=concurrency)
+
+
+def combine_sales_frames(frames):
+    """Concatenate per-file results in order and sort them stably by date."""
+    output_df = pd.concat(frames, ignore_index=True)
+
+
+    if len(output_df) == 0:
         raise ValueError("No Pink Morsel transactions found in the data!")
 
-    initial_count = len(pink_morsel_df)
-    pink_morsel_df = pink_morsel_df.dropna(subset=['price', 'quantity', 'date', 'region'])
-    final_count = len(pink_morsel_df)
+    return output_df.sort_values('Date', kind='stable').reset_index(drop=True)
+
+
+def merge_sales_frames(frames, output_file):
+    """Run combine_sales_frames and write the result to output_file."""
+    output_df = combine_sales_frames(frames)
+    output_df.to_csv(output_file, index=False)
+    return output_df
+
 
+def build_sales_data(input_files=RAW_INPUT_FILES, workers=1, backend=RAW_CSV_BACKEND,
+                     concurrency=None):
+    """
+    Pink Morsel sales of input_files in the consolidated layout, built in
+    memory. The ETL and both dashboards consolidate through this.
 
-    pink_morsel_df['price_numeric'] = pink_morsel_df['price'].apply(parse_price)
-    pink_morsel_df['Sales'] = pink_morsel_df['price_numeric'] * pink_morsel_df['quantity']
+    Each file is parsed and filtered independently, in a pool of `workers`
+    processes when workers > 1 (None uses every CPU), or read and parsed
+    `concurrency` files at a time by process_sales_files_async if set.
+    Results are merged in input order and stably sorted by date, so the
+    output is identical to the serial path.
+    """
+    if concurrency is not None:
+        if workers != 1:
+            raise ValueError("workers and concurrency cannot be combined")
+        results = [result for result in asyncio.run(
+                       process_sales_files_async(input_files, concurrency, backend=backend))
+                   if result is not None]
+        if not results:
+            raise FileNotFoundError("No valid input files found!")
+    else:
+        results = process_sales_files(find_input_files(input_files), workers, backend=backend)
 
-    output_df = pink_morsel_df[['Sales', 'date', 'region']].copy()
-    output_df.rename(columns={'date': 'Date', 'region': 'Region'}, inplace=True)
+    total_rows = sum(row_count for _, row_count, _ in results)
+    print(f"\nCombined dataset: {total_rows} total rows")
 
-    output_df = output_df.sort_values('Date').reset_index(drop=True)
+    unique_products = list(dict.fromkeys(p for _, _, products in results for p in products))
+    print(f"Products found: {unique_products}")
 
+    return combine_sales_frames([filtered for filtered, _, _ in results])
 
+
+def process_sales_data(input_files, output_file='pink_morsel_sales.csv', workers=1,
+                       backend=RAW_CSV_BACKEND, concurrency=None):
+    """Consolidate Pink Morsel sales from input_files into output_file with build_sales_data."""
+    output_df = build_sales_data(input_files, workers, backend, concurrency)
     output_df.to_csv(output_file, index=False)
     return output_df
 
 
-def main():
+def consolidate_products(input_files, workers=1, backend=RAW_CSV_BACKEND):
+    """
+    Read input_files once and return the sales of every product, in the
+    consolidated layout plus a Product column, stably sorted by date.
+    """
+    existing_files = find_input_files(input_files)
+    results = process_sales_files(existing_files, workers, all_products=True, backend=backend)
+
+    total_rows = sum(row_count for _, row_count, _ in results)
+    print(f"\nCombined dataset: {total_rows} total rows")
+
+    combined = pd.concat([filtered for filtered, _, _ in results], ignore_index=True)
+    if len(combined) == 0:
+        raise ValueError("No sales transactions found in the data!")
+    return combined.sort_values('Date', kind='stable').reset_index(drop=True)
+
+
+def process_product_sales(input_files, output_dir=PRODUCT_SALES_DIR, workers=1):
+    """
+    Consolidate the sales of every product from input_files in a single pass
+    over them, writing one file per product under output_dir (see
+    product_file) in the consolidated layout, stably sorted by date.
+    Returns {product: path}.
+    """
+    return write_product_files(consolidate_products(input_files, workers), output_dir)
+
 
-    # Define input files
-    input_files = [
-        'data/daily_sales_data_0.csv',
-        'data/daily_sales_data_1.csv',
-        'data/daily_sales_data_2.csv'
+def write_product_files(combined, output_dir=PRODUCT_SALES_DIR):
+    """Write consolidate_products output as one file per product; returns {product: path}."""
+    os.makedirs(output_dir, exist_ok=True)
+    paths = {}
+    for product, product_df in combined.groupby('Product', sort=True):
+        path = product_file(product, output_dir)
+        tmp_file = f"{path}.tmp"
+        product_df.drop(columns='Product').to_csv(tmp_file, index=False)
+        os.replace(tmp_file, path)
+        paths[product] = path
+
+    print(f"Products written to {output_dir}: {list(paths)}")
+    return paths
+
+
+# Hive-style dataset written by write_partitioned
+SALES_DATASET_DIR = 'sales_dataset'
+
+
+def generation_dir(dataset_dir, generation):
+    """E.g. sales_dataset/generation=000003, the directory of one write of a dataset."""
+    return Path(dataset_dir) / f"generation={generation:06d}"
+
+
+def partition_path(dataset_dir, product, year, month):
+    """E.g. <generation dir>/product=pink_morsel/year=2021/month=01/part-0.csv."""
+    return (Path(dataset_dir) / f"product={product.replace(' ', '_')}"
+            / f"year={year:04d}" / f"month={month:02d}" / 'part-0.csv')
+
+
+def write_partitioned(combined, dataset_dir=SALES_DATASET_DIR):
+    """
+    Write consolidate_products output as a Hive-style dataset partitioned by
+    product, year and month, each partition in the consolidated layout.
+
+    _manifest.json lists every partition with its product, date range,
+    regions and row count, so readers can prune partitions without opening
+    them.
+
+    Each write goes to a fresh generation directory and the manifest, which
+    names the generation, is swapped in atomically last, so a reader sees
+    either the previous dataset or the new one, never a mix. The previous
+    generation is kept for readers still holding the old manifest; older
+    ones are deleted. Returns the manifest.
+    """
+    previous = read_manifest(dataset_dir)
+    previous_generation = previous.get('generation') if previous is not None else None
+    generation = 0 if previous_generation is None else previous_generation + 1
+    root = generation_dir(dataset_dir, generation)
+    if root.exists():  # left behind by an interrupted write
+        shutil.rmtree(root)
+
+    dates = pd.to_datetime(combined['Date'])
+    partitions = []
+    for (product, year, month), part in combined.groupby(
+            [combined['Product'], dates.dt.year, dates.dt.month], sort=True):
+        path = partition_path(root, product, year, month)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        part.drop(columns='Product').to_csv(path, index=False)
+        part_dates = dates.loc[part.index]
+        partitions.append({
+            'path': path.relative_to(dataset_dir).as_posix(),
+            'product': product,
+            'min_date': part_dates.min().strftime('%Y-%m-%d'),
+            'max_date': part_dates.max().strftime('%Y-%m-%d'),
+            'regions': sorted(part['Region'].unique().tolist()),
+            'rows': len(part),
+        })
+
+    manifest = {'generation': generation, 'partitions': partitions}
+    manifest_file = Path(dataset_dir) / '_manifest.json'
+    tmp_manifest = f"{manifest_file}.tmp"
+    with open(tmp_manifest, 'w') as f:
+        json.dump(manifest, f, indent=2)
+    os.replace(tmp_manifest, manifest_file)
+    remove_old_generations(dataset_dir, {root.name, generation_dir(dataset_dir, generation - 1).name})
+
+    print(f"Dataset written to {dataset_dir}: {len(partitions)} partitions")
+    return manifest
+
+
+def remove_old_generations(dataset_dir, keep):
+    """Delete the generation directories of a dataset not named in `keep`, and any legacy product= ones."""
+    for path in Path(dataset_dir).iterdir():
+        if path.is_dir() and path.name.startswith(('generation=', 'product=')) and path.name not in keep:
+            shutil.rmtree(path)
+
+
+def list_partitioned_products(dataset_dir=SALES_DATASET_DIR):
+    """Products listed in a partitioned dataset's manifest, sorted by name."""
+    manifest = read_manifest(dataset_dir)
+    if manifest is None:
+        return []
+    return sorted({entry['product'] for entry in manifest['partitions']})
+
+
+def read_manifest(dataset_dir=SALES_DATASET_DIR):
+    """The manifest of a partitioned dataset, or None if dataset_dir has none."""
+    manifest_file = Path(dataset_dir) / '_manifest.json'
+    if not manifest_file.exists():
+        return None
+    with open(manifest_file) as f:
+        return json.load(f)
+
+
+def prune_partitions(manifest, products=None, start=None, end=None, regions=None, last_days=None):
+    """
+    Manifest entries of the partitions that can hold rows matching the
+    filters: lower-case products and regions, an inclusive start/end date
+    range, or the last_days days up to the newest matching date.
+    """
+    partitions = [
+        entry for entry in manifest['partitions']
+        if (products is None or entry['product'] in products)
+        and (regions is None or not set(regions).isdisjoint(entry['regions']))
+    ]
+    if last_days is not None and partitions:
+        newest = max(pd.Timestamp(entry['max_date']) for entry in partitions)
+        recent = newest - pd.Timedelta(days=last_days - 1)
+        start = recent if start is None else max(pd.Timestamp(start), recent)
+    if start is not None:
+        partitions = [e for e in partitions if pd.Timestamp(e['max_date']) >= pd.Timestamp(start)]
+    if end is not None:
+        partitions = [e for e in partitions if pd.Timestamp(e['min_date']) <= pd.Timestamp(end)]
+    return partitions, start
+
+
+def read_partitioned(dataset_dir=SALES_DATASET_DIR, products=None, start=None, end=None,
+                     regions=None, last_days=None):
+    """
+    Load the rows of a partitioned dataset that match the filters (see
+    prune_partitions) in compact dtypes, with a Product column. Only the
+    partitions that can match are read; rows are then trimmed to the exact
+    dates and regions. Partitions are read in product, year, month order, so a
+    single product comes back sorted by date.
+    """
+    manifest = read_manifest(dataset_dir)
+    if manifest is None:
+        raise FileNotFoundError(f"No partitioned dataset in {dataset_dir}")
+    partitions, start = prune_partitions(manifest, products, start, end, regions, last_days)
+
+    frames = [
+        pd.read_csv(Path(dataset_dir) / entry['path'], parse_dates=['Date']).assign(Product=entry['product'])
+        for entry in partitions
     ]
-    output_file = 'pink_morsel_sales_consolidated.csv'
-    processed_data = process_sales_data(input_files, output_file)
+    if not frames:
+        return compact_sales_frame(pd.DataFrame({
+            'Sales': pd.Series(dtype=float), 'Date': pd.Series(dtype='datetime64[ns]'),
+            'Region': pd.Series(dtype=str), 'Product': pd.Series(dtype=str),
+        }))
+
+    df = pd.concat(frames, ignore_index=True)
+    keep = np.ones(len(df), dtype=bool)
+    if start is not None:
+        keep &= (df['Date'] >= pd.Timestamp(start)).to_numpy()
+    if end is not None:
+        keep &= (df['Date'] <= pd.Timestamp(end)).to_numpy()
+    if regions is not None:
+        keep &= df['Region'].isin(regions).to_numpy()
+    if not keep.all():
+        df = df[keep].reset_index(drop=True)
+
+    df['Product'] = df['Product'].astype('category')
+    return compact_sales_frame(df)
+
+
+def dataset_version(dataset_dir=SALES_DATASET_DIR):
+    """Fingerprint of a partitioned dataset; changes whenever its manifest is rewritten."""
+    try:
+        stat = os.stat(Path(dataset_dir) / '_manifest.json')
+    except FileNotFoundError:
+        return None
+    return (str(dataset_dir), stat.st_size, stat.st_mtime_ns)
+
+
+def file_fingerprint(file_path, content_hash=False):
+    """Return the size and mtime of file_path, plus a SHA-256 digest if content_hash."""
+    stat = os.stat(file_path)
+    fingerprint = {'size': stat.st_size, 'mtime_ns': stat.st_mtime_ns}
+    if content_hash:
+        digest = hashlib.sha256()
+        with open(file_path, 'rb') as f:
+            for block in iter(lambda: f.read(1 << 20), b''):
+                digest.update(block)
+        fingerprint['sha256'] = digest.hexdigest()
+    return fingerprint
+
+
+# Version of the partial results cached by the incremental ETL; bump it whenever
+# process_sales_file's output changes (e.g. region normalization) so old ones are redone
+PARTIAL_FORMAT_VERSION = 2
+
+
+def is_unchanged(file_path, entry, content_hash=False, backend=RAW_CSV_BACKEND):
+    """
+    Check a manifest entry against the current state of file_path. Partials
+    written in another format version or by another CSV backend count as
+    changed.
+    """
+    if entry is None or not os.path.exists(entry['partial']):
+        return False
+    if entry.get('format') != PARTIAL_FORMAT_VERSION or entry.get('backend') != backend:
+        return False
+
+    fingerprint = file_fingerprint(file_path)
+    if fingerprint['size'] != entry['size']:
+        return False
+    if fingerprint['mtime_ns'] == entry['mtime_ns']:
+        return True
+
+    # Touched but possibly identical (e.g. re-copied): fall back to the content hash
+    if content_hash and 'sha256' in entry and \
+            file_fingerprint(file_path, content_hash=True)['sha256'] == entry['sha256']:
+        # Remember the new mtime so the file is not hashed again next run
+        entry['mtime_ns'] = fingerprint['mtime_ns']
+        return True
+    return False
+
+
+def process_sales_data_incremental(input_files, output_file='pink_morsel_sales.csv',
+                                   cache_dir='.etl_cache', content_hash=False, workers=1,
+                                   backend=RAW_CSV_BACKEND):
+    """
+    Consolidate Pink Morsel sales, re-processing only new or changed input files.
+
+    A manifest in cache_dir records the size, mtime (and SHA-256 when
+    content_hash is set) of every processed file together with its filtered
+    partial result, the partial's format version and the CSV backend. Unchanged files are served from their partials, which are
+    then re-merged exactly as process_sales_data would.
+    """
+    cache_path = Path(cache_dir)
+    partials_path = cache_path / 'partials'
+    partials_path.mkdir(parents=True, exist_ok=True)
+    manifest_file = cache_path / 'manifest.json'
+
+    manifest = {}
+    if manifest_file.exists():
+        with open(manifest_file) as f:
+            manifest = json.load(f)
+
+    existing_files = find_input_files(input_files)
+    keys = [os.path.abspath(file_path) for file_path in existing_files]
+
+    stale = [(file_path, key) for file_path, key in zip(existing_files, keys)
+             if not is_unchanged(file_path, manifest.get(key), content_hash, backend)]
+    print(f"\nIncremental run: {len(stale)} of {len(existing_files)} files new or changed")
+
+    results = process_sales_files([file_path for file_path, _ in stale], workers, backend=backend)
+    for (file_path, key), (filtered, _, _) in zip(stale, results):
+        partial = partials_path / f"{hashlib.sha1(key.encode()).hexdigest()[:16]}.csv"
+        filtered.to_csv(partial, index=False)
+        manifest[key] = {**file_fingerprint(file_path, content_hash), 'partial': str(partial),
+                         'format': PARTIAL_FORMAT_VERSION, 'backend': backend}
+
+    # Forget inputs that are no longer part of the run
+    for key in set(manifest) - set(keys):
+        entry = manifest.pop(key)
+        if os.path.exists(entry['partial']):
+            os.remove(entry['partial'])
+
+    output_df = merge_sales_frames(
+        [pd.read_csv(manifest[key]['partial'], parse_dates=['Date']) for key in keys], output_file
+    )
+
+    tmp_manifest = f"{manifest_file}.tmp"
+    with open(tmp_manifest, 'w') as f:
+        json.dump(manifest, f, indent=2)
+    os.replace(tmp_manifest, manifest_file)
+
+    return output_df
+
+
+def process_sales_data_streaming(input_files, output_file='pink_morsel_sales.csv', chunksize=100_000,
+                                 backend=RAW_CSV_BACKEND):
+    """
+    Stream the input files in chunks of `chunksize` rows (see
+    read_raw_sales_chunks), appending Pink Morsel rows to output_file as they
+    are filtered.
+
+    Peak memory depends on the chunk size rather than the dataset size. Rows are
+    written in input order (the daily files are already date ordered), so no
+    global sort is performed; a warning is printed if the input turns out not
+    to be in date order. Returns the number of rows written.
+    """
+    tmp_file = f"{output_file}.tmp"
+    rows_written = 0
+    files_read = 0
+    last_date = None
+    out_of_order = False
+
+    with open(tmp_file, 'w', newline='') as out:
+        for file_path in input_files:
+            if not os.path.exists(file_path):
+                print(f"Warning: File {file_path} not found. Skipping...")
+                continue
+
+            files_read += 1
+            for chunk in read_raw_sales_chunks(file_path, chunksize, backend):
+                output_df = filter_pink_morsel(chunk)
+                if len(output_df) == 0:
+                    continue
+                dates = output_df['Date']
+                if not out_of_order and (not dates.is_monotonic_increasing
+                                         or (last_date is not None and dates.iloc[0] < last_date)):
+                    out_of_order = True
+                    print(f"Warning: {file_path} is out of date order; "
+                          "the streamed output will not be sorted by date")
+                last_date = dates.iloc[-1]
+                output_df.to_csv(out, index=False, header=rows_written == 0)
+                rows_written += len(output_df)
+
+    if files_read == 0:
+        os.remove(tmp_file)
+        raise FileNotFoundError("No valid input files found!")
+
+    if rows_written == 0:
+        os.remove(tmp_file)
+        raise ValueError("No Pink Morsel transactions found in the data!")
+
+    # Only replace the previous output once the new one is complete
+    os.replace(tmp_file, output_file)
+    print(f"\nStreamed {rows_written} Pink Morsel rows from {files_read} files")
+    return rows_written
+
+
+def consolidated_arrow_schema():
+    """Typed Arrow schema of the consolidated dataset."""
+    return pa.schema([
+        ('Sales', pa.float64()),
+        ('Date', pa.timestamp('us')),
+        ('Region', pa.dictionary(pa.int32(), pa.string())),
+    ])
+
+
+def write_columnar(csv_file, parquet_file=None, block_size=1 << 24):
+    """
+    Convert a consolidated CSV into a typed Parquet file next to it, with Date
+    stored as a timestamp and Region dictionary encoded. The CSV is streamed in
+    blocks of `block_size` bytes, so this also works after a streaming run.
+    """
+    if pa is None:
+        raise ImportError("pyarrow is required to write columnar output")
+
+    parquet_file = parquet_file or Path(csv_file).with_suffix('.parquet')
+    schema = consolidated_arrow_schema()
+    reader = pa_csv.open_csv(
+        csv_file,
+        read_options=pa_csv.ReadOptions(block_size=block_size),
+        convert_options=pa_csv.ConvertOptions(
+            column_types={field.name: field.type for field in schema}
+        ),
+    )
+
+    # Write next to the target and swap in so readers never see a partial file
+    tmp_file = f"{parquet_file}.tmp"
+    with pq.ParquetWriter(tmp_file, reader.schema) as writer:
+        for batch in reader:
+            writer.write_batch(batch)
+    os.replace(tmp_file, parquet_file)
+    return parquet_file
+
+
+def write_arrow_store(csv_file, arrow_file=None):
+    """
+    Convert a consolidated CSV into an uncompressed Arrow IPC file that the
+    dashboards memory-map instead of parsing. Columns are written as single
+    contiguous chunks (Region with int8 dictionary codes) so they can be
+    exposed to pandas without copying.
+    """
+    if pa is None:
+        raise ImportError("pyarrow is required to write the Arrow store")
+
+    arrow_file = arrow_file or Path(csv_file).with_suffix('.arrow')
+    schema = consolidated_arrow_schema()
+    table = pa_csv.read_csv(
+        csv_file,
+        convert_options=pa_csv.ConvertOptions(
+            column_types={field.name: field.type for field in schema}
+        ),
+    )
+    table = table.unify_dictionaries().combine_chunks().cast(
+        schema.set(2, pa.field('Region', pa.dictionary(pa.int8(), pa.string())))
+    )
+
+    tmp_file = f"{arrow_file}.tmp"
+    with pa_ipc.new_file(tmp_file, table.schema) as writer:
+        writer.write_table(table)
+    os.replace(tmp_file, arrow_file)
+    return arrow_file
+
+
+def read_arrow_store(arrow_file):
+    """
+    Memory-map an Arrow IPC store and wrap it in a DataFrame without copying.
+
+    Sales and Date are numpy views of the mapped buffers, and Region is a
+    categorical whose int8 codes are a view of the mapped dictionary indices
+    (only the category names are copied). Every worker process mapping the
+    same file shares one copy in the OS page cache.
+    """
+    table = pa_ipc.open_file(pa.memory_map(str(arrow_file))).read_all()
+    return table.to_pandas(split_blocks=True)
+
+
+def is_fresh(derived_file, source_file):
+    """True if derived_file exists and is at least as new as source_file."""
+    if not os.path.exists(derived_file):
+        return False
+    if not os.path.exists(source_file):
+        return True
+    return os.path.getmtime(derived_file) >= os.path.getmtime(source_file)
+
+
+def compact_sales_frame(df):
+    """
+    Convert consolidated sales data to compact dtypes in place: Region as a
+    categorical (one small integer code per row), Date as datetime64 and Sales
+    as float32 when that holds every value exactly.
+    """
+    if not isinstance(df['Region'].dtype, pd.CategoricalDtype):
+        df['Region'] = df['Region'].astype('category')
+    if not pd.api.types.is_datetime64_any_dtype(df['Date']):
+        df['Date'] = pd.to_datetime(df['Date'])
+    if df['Sales'].dtype == np.float64:
+        compact = df['Sales'].astype(np.float32)
+        if np.array_equal(compact.to_numpy(dtype=np.float64), df['Sales'].to_numpy(), equal_nan=True):
+            df['Sales'] = compact
+    return df
+
+
+def read_consolidated(csv_file=CONSOLIDATED_FILE):
+    """
+    Load the consolidated sales data in compact dtypes, preferring an
+    up-to-date Arrow store (memory-mapped) or Parquet sibling of csv_file over
+    re-parsing the CSV.
+    """
+    arrow_file = Path(csv_file).with_suffix('.arrow')
+    parquet_file = Path(csv_file).with_suffix('.parquet')
+    if pa is not None and is_fresh(arrow_file, csv_file):
+        # Already typed, with Region dictionary coded; converting Sales would
+        # copy it out of the shared mapping
+        return read_arrow_store(arrow_file)
+    if pa is not None and is_fresh(parquet_file, csv_file):
+        return compact_sales_frame(pd.read_parquet(parquet_file))
+
+    return compact_sales_frame(pd.read_csv(csv_file, dtype={'Region': 'category'}, parse_dates=['Date']))
+
+
+def build_consolidated(csv_file=CONSOLIDATED_FILE, input_files=RAW_INPUT_FILES, backend=RAW_CSV_BACKEND):
+    """
+    Build csv_file in-process from the raw input files and return it as
+    read_consolidated would. The file is written atomically so later loads
+    (and other workers) read it instead of rebuilding; if it cannot be
+    written, the data is still returned. Each build writes its own temporary
+    file, so workers cold-starting at once never publish each other's
+    partial output.
+    """
+    df = build_sales_data(input_files, backend=backend)
+    tmp_file = None
+    try:
+        fd, tmp_file = tempfile.mkstemp(dir=os.path.dirname(csv_file) or '.',
+                                        prefix=f"{os.path.basename(csv_file)}.", suffix='.tmp')
+        with os.fdopen(fd, 'w', newline='') as f:
+            df.to_csv(f, index=False)
+        os.replace(tmp_file, csv_file)
+    except OSError as e:
+        print(f"Warning: could not write {csv_file}, serving the data from memory: {e}")
+        if tmp_file is not None and os.path.exists(tmp_file):
+            os.remove(tmp_file)
+    return compact_sales_frame(df)
+
+
+def load_consolidated(csv_file=CONSOLIDATED_FILE, input_files=RAW_INPUT_FILES):
+    """read_consolidated, building csv_file from input_files first on a cold start."""
+    if not os.path.exists(csv_file):
+        print(f"{csv_file} not found, building it from the raw sales files")
+        return build_consolidated(csv_file, input_files)
+    return read_consolidated(csv_file)
+
+
+def consolidated_version(csv_file=CONSOLIDATED_FILE):
+    """
+    Fingerprint of the consolidated dataset: size and mtime of csv_file and
+    of its Arrow/Parquet siblings. Changes whenever any of them is rewritten.
+    """
+    version = []
+    for path in (Path(csv_file), Path(csv_file).with_suffix('.arrow'),
+                 Path(csv_file).with_suffix('.parquet')):
+        try:
+            stat = os.stat(path)
+        except FileNotFoundError:
+            continue
+        version.append((path.name, stat.st_size, stat.st_mtime_ns))
+    return tuple(version)
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Consolidate Pink Morsel sales data.")
+    parser.add_argument('--chunksize', type=int, default=None,
+                        help="Stream input files in chunks of this many rows")
+    parser.add_argument('--workers', type=int, default=1,
+                        help="Number of worker processes used to parse input files (0 = all CPUs)")
+    parser.add_argument('--input-glob', default=None,
+                        help=f"Read every input shard matching this pattern, e.g. '{INPUT_GLOB}'")
+    parser.add_argument('--async-io', action='store_true',
+                        help="Read input files concurrently (for high-latency storage)")
+    parser.add_argument('--concurrency', type=int, default=None,
+                        help="Maximum number of files read at once with --async-io (default 16)")
+    parser.add_argument('--incremental', action='store_true',
+                        help="Only re-process input files that changed since the last run")
+    parser.add_argument('--cache-dir', default=None,
+                        help="Directory holding the incremental manifest and partial results "
+                             "(default .etl_cache)")
+    parser.add_argument('--content-hash', action='store_true',
+                        help="Record SHA-256 digests so touched but identical files are skipped")
+    parser.add_argument('--columnar', action='store_true',
+                        help="Also write a typed Parquet copy of the output for the dashboards")
+    parser.add_argument('--arrow-store', action='store_true',
+                        help="Also write an Arrow IPC store the dashboards can memory-map")
+    parser.add_argument('--all-products', action='store_true',
+                        help="Consolidate every product in one pass, one file per product")
+    parser.add_argument('--product-dir', default=None,
+                        help="Directory for the per-product files written by --all-products "
+                             f"(default {PRODUCT_SALES_DIR})")
+    parser.add_argument('--partitioned', action='store_true',
+                        help="Also write every product as a product/year/month partitioned dataset")
+    parser.add_argument('--dataset-dir', default=None,
+                        help="Directory for the partitioned dataset written by --partitioned "
+                             f"(default {SALES_DATASET_DIR})")
+    parser.add_argument('--csv-backend', choices=sorted(CSV_BACKENDS), default=RAW_CSV_BACKEND,
+                        help="Parser for the raw input files")
+    args = parser.parse_args(argv)
+
+    # Each mode honours only some options; refuse combinations that would be ignored
+    modes = [flag for flag, enabled in (
+        ('--all-products/--partitioned', args.all_products or args.partitioned),
+        ('--incremental', args.incremental),
+        ('--chunksize', args.chunksize is not None),
+        ('--async-io', args.async_io),
+    ) if enabled]
+    if len(modes) > 1:
+        parser.error(f"{' and '.join(modes)} cannot be combined")
+    if args.chunksize is not None and args.chunksize < 1:
+        parser.error("--chunksize must be a positive number of rows")
+    if args.workers != 1 and (args.chunksize is not None or args.async_io):
+        parser.error(f"--workers cannot be combined with {modes[0]}")
+    for option, value, mode, enabled in (
+        ('--concurrency', args.concurrency, '--async-io', args.async_io),
+        ('--content-hash', args.content_hash or None, '--incremental', args.incremental),
+        ('--cache-dir', args.cache_dir, '--incremental', args.incremental),
+        ('--product-dir', args.product_dir, '--all-products', args.all_products),
+        ('--dataset-dir', args.dataset_dir, '--partitioned', args.partitioned),
+    ):
+        if value is not None and not enabled:
+            parser.error(f"{option} requires {mode}")
+    if args.concurrency is not None and args.concurrency < 1:
+        parser.error("--concurrency must be at least 1")
+
+    args.concurrency = args.concurrency or 16
+    args.cache_dir = args.cache_dir or '.etl_cache'
+    args.product_dir = args.product_dir or PRODUCT_SALES_DIR
+    args.dataset_dir = args.dataset_dir or SALES_DATASET_DIR
+    return args
+
+
+def main(argv=None):
+    args = parse_args(argv)
+
+    input_files = RAW_INPUT_FILES
+    if args.input_glob:
+        input_files = discover_input_files(args.input_glob)
+    output_file = CONSOLIDATED_FILE
+    output_files = [output_file]
+    if args.all_products or args.partitioned:
+        combined = consolidate_products(input_files, workers=args.workers or None,
+                                        backend=args.csv_backend)
+        # The same pass also refreshes the default Pink Morsel file
+        pink_morsel = combined[combined['Product'] == 'pink morsel'].drop(columns='Product')
+        pink_morsel.to_csv(output_file, index=False)
+        if args.all_products:
+            paths = write_product_files(combined, args.product_dir)
+            output_files += [str(path) for path in paths.values()]
+        if args.partitioned:
+            write_partitioned(combined, args.dataset_dir)
+    elif args.incremental:
+        process_sales_data_incremental(input_files, output_file, cache_dir=args.cache_dir,
+                                       content_hash=args.content_hash, workers=args.workers or None,
+                                       backend=args.csv_backend)
+    elif args.chunksize is not None:
+        process_sales_data_streaming(input_files, output_file, chunksize=args.chunksize,
+                                     backend=args.csv_backend)
+    else:
+        concurrency = args.concurrency if args.async_io else None
+        processed_data = process_sales_data(input_files, output_file, workers=args.workers or None,
+                                            backend=args.csv_backend, concurrency=concurrency)
+
+    for path in output_files:
+        if args.columnar:
+            write_columnar(path)
+        if args.arrow_store:
+            write_arrow_store(path)
     return 0
 
 if __name__ == "__main__":
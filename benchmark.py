@@ -0,0 +1,215 @@
+"""
+Micro-benchmarks for the sales data pipeline.
+
+Run a single benchmark with e.g. `python benchmark.py prices --rows 2000000`,
+or every benchmark with `python benchmark.py all`.
+"""
+import argparse
+import asyncio
+import subprocess
+import sys
+import tempfile
+import time
+
+import numpy as np
+import pandas as pd
+
+import Data_filtering
+import sales_analytics
+
+
+def timed(func, *args, repeat=3, **kwargs):
+    """Return the best wall time in seconds over `repeat` runs of func."""
+    best = float('inf')
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func(*args, **kwargs)
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def report(name, rows, seconds):
+    print(f"  {name:<28} {seconds * 1000:10.1f} ms  {rows / seconds:14,.0f} rows/sec")
+
+
+def bench_price_parsing(rows):
+    """Compare per-row parse_price via Series.apply with vectorized parse_prices."""
+    rng = np.random.default_rng(0)
+    prices = pd.Series(rng.choice(['$3.00', '$5.00', '$9.99', '$2.50', '$4.99'], size=rows))
+
+    print(f"Price parsing ({rows:,} rows)")
+    report('apply(parse_price)', rows, timed(prices.apply, Data_filtering.parse_price))
+    report('parse_prices', rows, timed(Data_filtering.parse_prices, prices))
+
+
+def sample_sales(rows):
+    """Random transactions in the consolidated layout over four regions and about three years."""
+    rng = np.random.default_rng(0)
+    return pd.DataFrame({
+        'Sales': rng.integers(1, 2000, size=rows).astype(float),
+        'Date': pd.Timestamp('2018-02-06') + pd.to_timedelta(rng.integers(0, 1100, size=rows), unit='D'),
+        'Region': rng.choice(['north', 'south', 'east', 'west'], size=rows),
+    })
+
+
+def bench_date_index(rows):
+    """
+    Compare boolean masking of the full frame with binary search on
+    DateIndexedSales, for a before/after split and a one-month window.
+    """
+    df = sample_sales(rows)
+    split = pd.Timestamp('2021-01-15')
+    start, end = pd.Timestamp('2020-06-01'), pd.Timestamp('2020-07-01')
+
+    def masked_split():
+        north = df[df['Region'] == 'north']
+        before = north[north['Date'] < split]
+        after = north[north['Date'] >= split]
+        return before['Sales'].sum(), before['Date'].nunique(), after['Sales'].sum(), after['Date'].nunique()
+
+    def masked_window():
+        return df.loc[(df['Date'] >= start) & (df['Date'] < end), 'Sales']
+
+    print(f"Date queries ({rows:,} rows)")
+    report('build DateIndexedSales', rows, timed(sales_analytics.DateIndexedSales, df))
+    index = sales_analytics.DateIndexedSales(df)
+    report('mask before/after', rows, timed(masked_split))
+    report('index before/after', rows, timed(index.period_stats, split, 'north'))
+    report('mask window', rows, timed(masked_window))
+    report('index window', rows, timed(index.window, 'all', start, end))
+
+
+PRODUCTS = ['pink morsel', 'gold morsel', 'magenta morsel', 'chartreuse morsel',
+            'periwinkle morsel', 'vermilion morsel', 'lapis morsel']
+
+
+def sample_raw_sales(rows):
+    """Random transactions in the raw daily sales layout, over the seven products."""
+    rng = np.random.default_rng(0)
+    return pd.DataFrame({
+        'product': rng.choice(PRODUCTS, size=rows),
+        'price': rng.choice(['$3.00', '$5.00', '$9.99'], size=rows),
+        'quantity': rng.integers(1, 1000, size=rows),
+        'date': pd.Timestamp('2018-02-06') + pd.to_timedelta(rng.integers(0, 1100, size=rows), unit='D'),
+        'region': rng.choice(['north', 'south', 'east', 'west'], size=rows),
+    })
+
+
+def bench_csv_backends(rows):
+    """
+    Compare the raw CSV parsers in Data_filtering.CSV_BACKENDS on one file:
+    parsing alone, parsing every row then extracting the Pink Morsel rows,
+    and extracting them with the product filter pushed into the read.
+    """
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        path = f"{tmp_dir}/daily_sales_data_0.csv"
+        sample_raw_sales(rows).to_csv(path, index=False)
+
+        print(f"Raw CSV parsing ({rows:,} rows)")
+        for backend in Data_filtering.CSV_BACKENDS:
+            try:
+                report(f'{backend} read', rows, timed(Data_filtering.read_raw_sales, path, backend))
+            except ImportError as e:
+                print(f"  {backend:<28} skipped: {e}")
+                continue
+            report(f'{backend} read + extract', rows, timed(
+                lambda: Data_filtering.process_sales_frame(Data_filtering.read_raw_sales(path, backend))
+            ))
+            report(f'{backend} pushdown + extract', rows,
+                   timed(Data_filtering.process_sales_file, path, backend=backend))
+
+
+def bench_async_reads(rows, shards=64, latency=0.05):
+    """
+    Compare reading raw sales shards one at a time with the asyncio front end,
+    with `latency` seconds added to every file read to stand in for network
+    storage.
+    """
+    raw = sample_raw_sales(rows)
+
+    open_input = Data_filtering.open_input
+
+    def slow_open(file_path):
+        time.sleep(latency)
+        return open_input(file_path)
+
+    def serial(paths):
+        results = []
+        for path in paths:
+            with slow_open(path) as stream:
+                results.append(Data_filtering.process_sales_file(stream))
+        return results
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        paths = []
+        for i, rows_in_shard in enumerate(np.array_split(np.arange(rows), shards)):
+            paths.append(f"{tmp_dir}/daily_sales_data_{i}.csv")
+            raw.iloc[rows_in_shard].to_csv(paths[-1], index=False)
+
+        print(f"Reading {shards} shards ({rows:,} rows, {latency * 1000:.0f} ms latency per file)")
+        Data_filtering.open_input = slow_open
+        try:
+            report('one file at a time', rows, timed(serial, paths, repeat=1))
+            for concurrency in (4, 16):
+                report(f'asyncio, {concurrency} at a time', rows, timed(
+                    lambda: asyncio.run(Data_filtering.process_sales_files_async(paths, concurrency)),
+                    repeat=1
+                ))
+        finally:
+            Data_filtering.open_input = open_input
+
+
+STARTUP_SNIPPET = """
+import time
+start = time.perf_counter()
+import {module} as app_module
+imported = time.perf_counter()
+with app_module.server.test_request_context('/'):
+    app_module.app.layout()
+print(imported - start, time.perf_counter() - start)
+"""
+
+
+def bench_startup(rows):
+    """
+    Time a cold import of each dashboard module in a fresh interpreter, and the
+    import plus building the first page, which is what importing used to cost
+    before data loading was deferred.
+    """
+    print("Dashboard startup (fresh interpreter, best of 3)")
+    for module in ('dash_app', 'visualization_dash_app'):
+        runs = []
+        for _ in range(3):
+            output = subprocess.run(
+                [sys.executable, '-c', STARTUP_SNIPPET.format(module=module)],
+                check=True, capture_output=True, text=True
+            ).stdout.split()
+            runs.append((float(output[-2]), float(output[-1])))
+        import_time, first_page = min(runs)
+        print(f"  {module:<24} import {import_time * 1000:8.1f} ms"
+              f"   import + first page {first_page * 1000:8.1f} ms")
+
+
+BENCHMARKS = {
+    'async': bench_async_reads,
+    'csv': bench_csv_backends,
+    'dates': bench_date_index,
+    'prices': bench_price_parsing,
+    'startup': bench_startup,
+}
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Run sales pipeline benchmarks.")
+    parser.add_argument('benchmark', choices=sorted(BENCHMARKS) + ['all'])
+    parser.add_argument('--rows', type=int, default=1_000_000)
+    args = parser.parse_args(argv)
+
+    names = sorted(BENCHMARKS) if args.benchmark == 'all' else [args.benchmark]
+    for name in names:
+        BENCHMARKS[name](args.rows)
+    return 0
+
+
+if __name__ == "__main__":
+    exit(main())
@@ -1,62 +1,44 @@
 import dash
 from dash import dcc, html, Input, Output, callback
-import plotly.express as px
+from flask import has_request_context
 import plotly.graph_objects as go
-import pandas as pd
 import datetime as dt
 from datetime import datetime
 
+from Data_filtering import CONSOLIDATED_FILE, build_sales_data, load_consolidated
+from sales_analytics import DateIndexedSales, region_box_stats
+from sales_store import LazyDataset
+
 # Initialize the Dash app
 app = dash.Dash(__name__)
+# Flask server for WSGI hosts, e.g. `gunicorn dash_app:server`
+server = app.server
 
 
-def load_and_process_data(csv_file='pink_morsel_sales_consolidated.csv'):
-    df = pd.read_csv(csv_file)
-
-    df['Date'] = pd.to_datetime(df['Date'])
+def load_and_process_data(csv_file=CONSOLIDATED_FILE):
+    # Uses the Arrow store or typed Parquet copy when the ETL has written one,
+    # and builds the file in-process from the raw data on a cold start
+    df = load_consolidated(csv_file)
 
-    df = df.sort_values('Date').reset_index(drop=True)
+    # Already sorted data (e.g. a memory-mapped store) is kept as is, avoiding a copy
+    if not df['Date'].is_monotonic_increasing:
+        df = df.sort_values('Date', kind='stable').reset_index(drop=True)
 
     return df
 
 
 def create_processed_data():
-
-    input_files = [
-        'data/daily_sales_data_0.csv',
-        'data/daily_sales_data_1.csv',
-        'data/daily_sales_data_2.csv'
-    ]
-
-    all_data = []
-
-    # Combine and process
-    combined_df = pd.concat(all_data, ignore_index=True)
-    pink_morsel_df = combined_df[
-        combined_df['product'].str.lower() == 'pink morsel'
-        ].copy()
-
-    # Parse price and calculate sales
-    pink_morsel_df['price_numeric'] = pink_morsel_df['price'].str.replace('$', '').astype(float)
-    pink_morsel_df['Sales'] = pink_morsel_df['price_numeric'] * pink_morsel_df['quantity']
-
-    # Create output format
-    output_df = pink_morsel_df[['Sales', 'date', 'region']].copy()
-    output_df.rename(columns={'date': 'Date', 'region': 'Region'}, inplace=True)
-
-    return output_df
-
-# Load the data
-df = load_and_process_data()
+    """Consolidate the raw daily sales files with the ETL's processing core."""
+    return build_sales_data()
 
 # Define the price increase date
 PRICE_INCREASE_DATE = datetime(2021, 1, 15)
 
 
-def create_sales_chart(df):
+def create_sales_chart(sales):
 
-    # Aggregate daily sales across all regions
-    daily_sales = df.groupby('Date')['Sales'].sum().reset_index()
+    # Daily sales across all regions, straight from the date index
+    daily_sales = sales.daily().rename_axis('Date').reset_index()
 
     # Create the line chart
     fig = go.Figure()
@@ -148,155 +130,197 @@ def create_sales_chart(df):
     return fig
 
 
-def calculate_period_stats(df):
-
-    df_copy = df.copy()
-    df_copy['Date'] = pd.to_datetime(df_copy['Date'])
-
-    before_increase = df_copy[df_copy['Date'] < PRICE_INCREASE_DATE]
-    after_increase = df_copy[df_copy['Date'] >= PRICE_INCREASE_DATE]
+def calculate_period_stats(sales):
+    # Split at the price increase by binary search on the sorted date index
+    return sales.period_stats(PRICE_INCREASE_DATE)
 
-    # Calculate daily averages
-    before_daily = before_increase.groupby('Date')['Sales'].sum()
-    after_daily = after_increase.groupby('Date')['Sales'].sum()
 
-    stats = {
-        'before_avg': before_daily.mean(),
-        'after_avg': after_daily.mean(),
-        'before_total': before_increase['Sales'].sum(),
-        'after_total': after_increase['Sales'].sum(),
-        'before_days': len(before_daily),
-        'after_days': len(after_daily),
-        'percent_change': ((after_daily.mean() - before_daily.mean()) / before_daily.mean()) * 100
-    }
+# Placeholder numbers for the page structure Dash validates at startup
+EMPTY_STATS = {
+    'before_avg': 0,
+    'after_avg': 0,
+    'before_total': 0,
+    'after_total': 0,
+    'before_days': 0,
+    'after_days': 0,
+    'percent_change': 0
+}
 
-    return stats
 
+def create_regional_chart(box_stats):
+    # Drawn from per-region quartiles/whiskers and an outlier sample, not every row
+    fig = go.Figure()
+    for row in box_stats.itertuples():
+        fig.add_trace(go.Box(
+            x=[row.Region],
+            q1=[row.q1],
+            median=[row.median],
+            q3=[row.q3],
+            lowerfence=[row.lowerfence],
+            upperfence=[row.upperfence],
+            name=row.Region,
+            marker_color='#636EFA',
+            showlegend=False
+        ))
+        if row.outliers:
+            fig.add_trace(go.Scatter(
+                x=[row.Region] * len(row.outliers),
+                y=row.outliers,
+                mode='markers',
+                marker=dict(color='#636EFA'),
+                showlegend=False
+            ))
+
+    return fig.update_layout(
+        title='Sales Distribution by Region',
+        xaxis_title='Region',
+        yaxis_title='Sales',
+        template='plotly_white',
+        height=400
+    )
 
-# Calculate statistics
-stats = calculate_period_stats(df)
 
-# Define the app layout
-app.layout = html.Div([
-    # Header
-    html.Div([
-        html.H1(
-            "Pink Morsel Sales Analysis Dashboard",
-            style={
-                'textAlign': 'center',
-                'color': '#2C3E50',
-                'marginBottom': '10px',
-                'fontFamily': 'Arial, sans-serif'
-            }
-        ),
-        html.H3(
-            "Impact Analysis: Price Increase on January 15th, 2021",
-            style={
-                'textAlign': 'center',
-                'color': '#7F8C8D',
-                'marginBottom': '30px',
-                'fontFamily': 'Arial, sans-serif',
-                'fontWeight': 'normal'
-            }
-        )
-    ], style={'marginBottom': '20px'}),
-
-    # Key Metrics Cards
-    html.Div([
+def build_layout(stats, sales_figure, regional_figure):
+    return html.Div([
+        # Header
         html.Div([
-            html.H4("Before Price Increase", style={'color': '#3498DB', 'textAlign': 'center'}),
-            html.H2(f"${stats['before_avg']:,.0f}", style={'textAlign': 'center', 'color': '#2C3E50'}),
-            html.P("Average Daily Sales", style={'textAlign': 'center', 'color': '#7F8C8D'})
-        ], className='metric-card', style={
-            'backgroundColor': '#F8F9FA',
-            'padding': '20px',
-            'borderRadius': '10px',
-            'margin': '10px',
-            'border': '2px solid #3498DB',
-            'flex': '1'
-        }),
+            html.H1(
+                "Pink Morsel Sales Analysis Dashboard",
+                style={
+                    'textAlign': 'center',
+                    'color': '#2C3E50',
+                    'marginBottom': '10px',
+                    'fontFamily': 'Arial, sans-serif'
+                }
+            ),
+            html.H3(
+                "Impact Analysis: Price Increase on January 15th, 2021",
+                style={
+                    'textAlign': 'center',
+                    'color': '#7F8C8D',
+                    'marginBottom': '30px',
+                    'fontFamily': 'Arial, sans-serif',
+                    'fontWeight': 'normal'
+                }
+            )
+        ], style={'marginBottom': '20px'}),
+
+        # Key Metrics Cards
+        html.Div([
+            html.Div([
+                html.H4("Before Price Increase", style={'color': '#3498DB', 'textAlign': 'center'}),
+                html.H2(f"${stats['before_avg']:,.0f}", style={'textAlign': 'center', 'color': '#2C3E50'}),
+                html.P("Average Daily Sales", style={'textAlign': 'center', 'color': '#7F8C8D'})
+            ], className='metric-card', style={
+                'backgroundColor': '#F8F9FA',
+                'padding': '20px',
+                'borderRadius': '10px',
+                'margin': '10px',
+                'border': '2px solid #3498DB',
+                'flex': '1'
+            }),
 
+            html.Div([
+                html.H4("After Price Increase", style={'color': '#27AE60', 'textAlign': 'center'}),
+                html.H2(f"${stats['after_avg']:,.0f}", style={'textAlign': 'center', 'color': '#2C3E50'}),
+                html.P("Average Daily Sales", style={'textAlign': 'center', 'color': '#7F8C8D'})
+            ], className='metric-card', style={
+                'backgroundColor': '#F8F9FA',
+                'padding': '20px',
+                'borderRadius': '10px',
+                'margin': '10px',
+                'border': '2px solid #27AE60',
+                'flex': '1'
+            }),
+
+            html.Div([
+                html.H4("Change",
+                        style={'color': '#E74C3C' if stats['percent_change'] < 0 else '#27AE60', 'textAlign': 'center'}),
+                html.H2(f"{stats['percent_change']:+.1f}%", style={
+                    'textAlign': 'center',
+                    'color': '#E74C3C' if stats['percent_change'] < 0 else '#27AE60'
+                }),
+                html.P("Percentage Change", style={'textAlign': 'center', 'color': '#7F8C8D'})
+            ], className='metric-card', style={
+                'backgroundColor': '#F8F9FA',
+                'padding': '20px',
+                'borderRadius': '10px',
+                'margin': '10px',
+                'border': f"2px solid {'#E74C3C' if stats['percent_change'] < 0 else '#27AE60'}",
+                'flex': '1'
+            })
+        ], style={'display': 'flex', 'justifyContent': 'space-around', 'marginBottom': '30px'}),
+
+        # Main Chart
         html.Div([
-            html.H4("After Price Increase", style={'color': '#27AE60', 'textAlign': 'center'}),
-            html.H2(f"${stats['after_avg']:,.0f}", style={'textAlign': 'center', 'color': '#2C3E50'}),
-            html.P("Average Daily Sales", style={'textAlign': 'center', 'color': '#7F8C8D'})
-        ], className='metric-card', style={
-            'backgroundColor': '#F8F9FA',
-            'padding': '20px',
-            'borderRadius': '10px',
-            'margin': '10px',
-            'border': '2px solid #27AE60',
-            'flex': '1'
-        }),
+            dcc.Graph(
+                id='sales-chart',
+                figure=sales_figure
+            )
+        ], style={'marginBottom': '30px'}),
 
+        # Regional Breakdown
         html.Div([
-            html.H4("Change",
-                    style={'color': '#E74C3C' if stats['percent_change'] < 0 else '#27AE60', 'textAlign': 'center'}),
-            html.H2(f"{stats['percent_change']:+.1f}%", style={
-                'textAlign': 'center',
-                'color': '#E74C3C' if stats['percent_change'] < 0 else '#27AE60'
-            }),
-            html.P("Percentage Change", style={'textAlign': 'center', 'color': '#7F8C8D'})
-        ], className='metric-card', style={
-            'backgroundColor': '#F8F9FA',
-            'padding': '20px',
-            'borderRadius': '10px',
-            'margin': '10px',
-            'border': f"2px solid {'#E74C3C' if stats['percent_change'] < 0 else '#27AE60'}",
-            'flex': '1'
-        })
-    ], style={'display': 'flex', 'justifyContent': 'space-around', 'marginBottom': '30px'}),
-
-    # Main Chart
-    html.Div([
-        dcc.Graph(
-            id='sales-chart',
-            figure=create_sales_chart(df)
-        )
-    ], style={'marginBottom': '30px'}),
-
-    # Regional Breakdown
-    html.Div([
-        html.H3("Regional Sales Breakdown", style={'textAlign': 'center', 'color': '#2C3E50'}),
-        dcc.Graph(
-            id='regional-chart',
-            figure=px.box(
-                df,
-                x='Region',
-                y='Sales',
-                title='Sales Distribution by Region',
-                template='plotly_white'
-            ).update_layout(height=400)
-        )
-    ]),
-
-    # Business Conclusion
-    html.Div([
-        html.H3("Business Conclusion", style={'color': '#2C3E50', 'textAlign': 'center'}),
+            html.H3("Regional Sales Breakdown", style={'textAlign': 'center', 'color': '#2C3E50'}),
+            dcc.Graph(
+                id='regional-chart',
+                figure=regional_figure
+            )
+        ]),
+
+        # Business Conclusion
         html.Div([
-            html.P([
-                "The data clearly shows that Pink Morsel sales were ",
-                html.Strong(
-                    "HIGHER" if stats['percent_change'] > 0 else "LOWER",
-                    style={'color': '#27AE60' if stats['percent_change'] > 0 else '#E74C3C'}
-                ),
-                " after the price increase on January 15th, 2021."
-            ], style={'fontSize': '18px', 'textAlign': 'center'}),
-            html.P([
-                "Average daily sales changed by ",
-                html.Strong(f"{stats['percent_change']:+.1f}%",
-                            style={'color': '#27AE60' if stats['percent_change'] > 0 else '#E74C3C'}),
-                f" from ${stats['before_avg']:,.0f} to ${stats['after_avg']:,.0f} per day."
-            ], style={'fontSize': '16px', 'textAlign': 'center', 'color': '#7F8C8D'})
-        ], style={
-            'backgroundColor': '#F8F9FA',
-            'padding': '30px',
-            'borderRadius': '10px',
-            'border': f"2px solid {'#27AE60' if stats['percent_change'] > 0 else '#E74C3C'}"
-        })
-    ], style={'margin': '30px 0'})
-
-], style={'maxWidth': '1200px', 'margin': '0 auto', 'padding': '20px'})
+            html.H3("Business Conclusion", style={'color': '#2C3E50', 'textAlign': 'center'}),
+            html.Div([
+                html.P([
+                    "The data clearly shows that Pink Morsel sales were ",
+                    html.Strong(
+                        "HIGHER" if stats['percent_change'] > 0 else "LOWER",
+                        style={'color': '#27AE60' if stats['percent_change'] > 0 else '#E74C3C'}
+                    ),
+                    " after the price increase on January 15th, 2021."
+                ], style={'fontSize': '18px', 'textAlign': 'center'}),
+                html.P([
+                    "Average daily sales changed by ",
+                    html.Strong(f"{stats['percent_change']:+.1f}%",
+                                style={'color': '#27AE60' if stats['percent_change'] > 0 else '#E74C3C'}),
+                    f" from ${stats['before_avg']:,.0f} to ${stats['after_avg']:,.0f} per day."
+                ], style={'fontSize': '16px', 'textAlign': 'center', 'color': '#7F8C8D'})
+            ], style={
+                'backgroundColor': '#F8F9FA',
+                'padding': '30px',
+                'borderRadius': '10px',
+                'border': f"2px solid {'#27AE60' if stats['percent_change'] > 0 else '#E74C3C'}"
+            })
+        ], style={'margin': '30px 0'})
+
+    ], style={'maxWidth': '1200px', 'margin': '0 auto', 'padding': '20px'})
+
+
+def build_page_layout():
+    # Load the data
+    df = load_and_process_data()
+    sales = DateIndexedSales(df)
+
+    # Calculate statistics
+    stats = calculate_period_stats(sales)
+    return build_layout(stats, create_sales_chart(sales), create_regional_chart(region_box_stats(df)))
+
+
+# Data is loaded and the figures built on the first page load, not at import
+page_layout = LazyDataset(build_page_layout)
+
+
+def serve_layout():
+    # Dash calls a layout function once when it is assigned; outside a request,
+    # return the structure only so that importing the module stays cheap
+    if not has_request_context():
+        return build_layout(EMPTY_STATS, {}, {})
+    return page_layout.get()
+
+
+# Define the app layout
+app.layout = serve_layout
 
 # Run the app
 if __name__ == '__main__':
@@ -0,0 +1,227 @@
+"""
+Caching of dashboard callback results.
+
+LRUCache keeps results inside one process. SQLiteCache stores them in a
+SQLite file on local disk so every worker process on the host shares them.
+Both expose get/set/get_or_compute/clear/stats, so callers can use either.
+"""
+import os
+import pickle
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+
+
+class LRUCache:
+    """
+    Thread-safe bounded mapping with least-recently-used eviction that keeps
+    hit and miss counts.
+    """
+
+    def __init__(self, maxsize=32):
+        if maxsize < 1:
+            raise ValueError("maxsize must be at least 1")
+        self.maxsize = maxsize
+        self.hits = 0
+        self.misses = 0
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key, default=None):
+        with self._lock:
+            if key in self._data:
+                self._data.move_to_end(key)
+                self.hits += 1
+                return self._data[key]
+            self.misses += 1
+            return default
+
+    def set(self, key, value):
+        with self._lock:
+            self._data[key] = value
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+
+    def get_or_compute(self, key, compute):
+        """
+        Return the cached value for key, calling compute() to fill it on a miss.
+        compute runs outside the lock, so a slow miss never blocks hits.
+        """
+        missing = object()
+        value = self.get(key, missing)
+        if value is missing:
+            value = compute()
+            self.set(key, value)
+        return value
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+
+    def stats(self):
+        with self._lock:
+            return {
+                'hits': self.hits,
+                'misses': self.misses,
+                'size': len(self._data),
+                'maxsize': self.maxsize,
+            }
+
+
+class SQLiteCache:
+    """
+    Cache shared across processes through a SQLite file, with optional
+    time-to-live and least-recently-used eviction beyond `maxsize` entries.
+
+    Keys must have a stable repr (tuples of strings and numbers); values are
+    pickled. Hit and miss counts are kept per process.
+
+    Hits do not write: the access times used for eviction are collected in
+    memory and written in one transaction at the next set(), or once
+    `touch_interval` seconds have passed, so reads from every worker do not
+    queue on SQLite's write lock. Eviction order is therefore approximate
+    across processes, to within that interval.
+    """
+
+    def __init__(self, path, maxsize=256, ttl=None, touch_interval=1.0):
+        if maxsize < 1:
+            raise ValueError("maxsize must be at least 1")
+        self.path = str(path)
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.touch_interval = touch_interval
+        self.hits = 0
+        self.misses = 0
+        self._local = threading.local()
+        self._lock = threading.Lock()
+        self._touched = {}
+        self._flushed_at = time.time()
+        # Not kept: a module-level cache is created before a pre-fork server forks,
+        # and a SQLite connection must not be used from another process
+        conn = self._open()
+        try:
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS cache ("
+                "key TEXT PRIMARY KEY, value BLOB NOT NULL, "
+                "expires_at REAL, accessed_at REAL NOT NULL)"
+            )
+        finally:
+            conn.close()
+
+    def _open(self):
+        conn = sqlite3.connect(self.path, timeout=30, isolation_level=None)
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("PRAGMA synchronous=NORMAL")
+        return conn
+
+    def _connect(self):
+        # sqlite3 connections cannot be shared between threads or processes, so
+        # keep one per thread, opened again in a forked child
+        conn = getattr(self._local, 'conn', None)
+        if conn is None or self._local.pid != os.getpid():
+            conn = self._open()
+            self._local.conn = conn
+            self._local.pid = os.getpid()
+        return conn
+
+    def _take_touches(self, now):
+        """Pending (accessed_at, key) updates, emptying the queue."""
+        with self._lock:
+            touched, self._touched = self._touched, {}
+            self._flushed_at = now
+        return [(accessed_at, key) for key, accessed_at in touched.items()]
+
+    def _write_touches(self, conn, touches):
+        # Never move an entry back in time if another process saw it more recently
+        conn.executemany(
+            "UPDATE cache SET accessed_at = MAX(accessed_at, ?) WHERE key = ?", touches
+        )
+
+    def _count(self, hit):
+        with self._lock:
+            if hit:
+                self.hits += 1
+            else:
+                self.misses += 1
+
+    def get(self, key, default=None):
+        conn = self._connect()
+        now = time.time()
+        row = conn.execute(
+            "SELECT value, expires_at FROM cache WHERE key = ?", (repr(key),)
+        ).fetchone()
+        if row is None or (row[1] is not None and row[1] <= now):
+            self._count(hit=False)
+            return default
+
+        with self._lock:
+            self._touched[repr(key)] = now
+            due = now - self._flushed_at >= self.touch_interval
+        if due:
+            touches = self._take_touches(now)
+            conn.execute("BEGIN IMMEDIATE")
+            try:
+                self._write_touches(conn, touches)
+                conn.execute("COMMIT")
+            except Exception:
+                conn.execute("ROLLBACK")
+                raise
+        self._count(hit=True)
+        return pickle.loads(row[0])
+
+    def set(self, key, value):
+        conn = self._connect()
+        now = time.time()
+        expires_at = now + self.ttl if self.ttl is not None else None
+        blob = pickle.dumps(value, protocol=pickle.HIGHEST_PROTOCOL)
+
+        touches = self._take_touches(now)
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            # Record the pending hits first, so eviction sees them
+            self._write_touches(conn, touches)
+            conn.execute(
+                "INSERT OR REPLACE INTO cache (key, value, expires_at, accessed_at) "
+                "VALUES (?, ?, ?, ?)", (repr(key), blob, expires_at, now)
+            )
+            conn.execute("DELETE FROM cache WHERE expires_at IS NOT NULL AND expires_at <= ?", (now,))
+            conn.execute(
+                "DELETE FROM cache WHERE key IN ("
+                "SELECT key FROM cache ORDER BY accessed_at DESC LIMIT -1 OFFSET ?)",
+                (self.maxsize,)
+            )
+            conn.execute("COMMIT")
+        except Exception:
+            conn.execute("ROLLBACK")
+            raise
+
+    def get_or_compute(self, key, compute):
+        """Return the cached value for key, calling compute() to fill it on a miss."""
+        missing = object()
+        value = self.get(key, missing)
+        if value is missing:
+            value = compute()
+            self.set(key, value)
+        return value
+
+    def clear(self):
+        self._connect().execute("DELETE FROM cache")
+
+    def stats(self):
+        size = self._connect().execute("SELECT COUNT(*) FROM cache").fetchone()[0]
+        with self._lock:
+            return {
+                'hits': self.hits,
+                'misses': self.misses,
+                'size': size,
+                'maxsize': self.maxsize,
+            }
+
+
+def make_cache(path=None, maxsize=32, ttl=None):
+    """An in-process LRUCache, or a SQLiteCache shared through `path` if one is given."""
+    if path:
+        return SQLiteCache(path, maxsize=maxsize, ttl=ttl)
+    return LRUCache(maxsize=maxsize)
@@ -0,0 +1,479 @@
+"""
+Aggregations over the consolidated Pink Morsel sales data used by the dashboards.
+"""
+import json
+
+import numpy as np
+import pandas as pd
+
+
+def region_codes(regions):
+    """
+    Integer codes and sorted lower-cased names for a Region column, so that
+    names differing only by case share a code. Only the distinct names are
+    lower-cased, and a categorical column's existing codes are reused.
+    """
+    if isinstance(regions.dtype, pd.CategoricalDtype):
+        raw_codes, raw_names = regions.cat.codes.to_numpy(), regions.cat.categories
+    else:
+        raw_codes, raw_names = pd.factorize(regions)
+    lowered, names = pd.factorize(pd.Index(raw_names).astype(str).str.lower(), sort=True)
+    return lowered[raw_codes], [str(name) for name in names]
+
+
+def build_daily_rollup(df):
+    """
+    Pre-aggregate transaction-level sales into a Date x Region table of daily
+    totals, with lower-cased region names as columns. Dates on which a region
+    had no sales stay NaN, so they are not counted as trading days.
+    """
+    codes, names = region_codes(df['Region'])
+    sales = df['Sales'].astype(np.float64)
+    rollup = sales.groupby([df['Date'], codes]).sum().unstack()
+    rollup.columns = [names[code] for code in rollup.columns]
+    return rollup.sort_index()
+
+
+def daily_sales(rollup, selected_region='all'):
+    """Daily sales for one region, or summed over all regions, from the rollup."""
+    if selected_region == 'all':
+        daily = rollup.sum(axis=1, min_count=1)
+    elif selected_region.lower() in rollup.columns:
+        daily = rollup[selected_region.lower()]
+    else:
+        daily = pd.Series(dtype=float, index=rollup.index[:0])
+    return daily.dropna().rename('Sales')
+
+
+def load_events(path):
+    """
+    Read the event registry: a JSON list of events, each with an `id`, a
+    `name`, a `date` and optionally `window_days` to compare only that many
+    days on either side (the whole history otherwise). Returned in file order.
+    """
+    with open(path) as f:
+        events = pd.DataFrame(json.load(f))
+
+    if events.empty:
+        raise ValueError(f"No events defined in {path}")
+    if events['id'].duplicated().any():
+        raise ValueError(f"Duplicate event ids in {path}")
+    if 'window_days' not in events:
+        events['window_days'] = np.nan
+
+    events['date'] = pd.to_datetime(events['date'])
+    events['window_days'] = events['window_days'].astype(float)
+    return events[['id', 'name', 'date', 'window_days']]
+
+
+def with_total(rollup):
+    """The rollup with an 'all' column of daily totals, NaN on days without sales."""
+    return rollup.assign(all=rollup.sum(axis=1, min_count=1))
+
+
+def event_window_sums(daily, events, trading_days=None):
+    """
+    Raw before/after sales totals and trading-day counts of every column of
+    daily (dates x regions, NaN where there were no sales) for every event,
+    indexed by (event id, region). Trading days are the non-NaN cells unless
+    a boolean trading_days frame of the same shape is given.
+
+    Running totals and day counts are accumulated once over the date-sorted
+    rows. Each event's window edges are then found by binary search, and its
+    sums are differences of the running arrays, so each extra event costs a
+    few lookups rather than another scan. Before is [date - window, date) and
+    after is [date, date + window); without a window both run to the ends of
+    the data.
+    """
+    values = daily.to_numpy(dtype=float)
+    if trading_days is None:
+        trading_days = ~np.isnan(values)
+    zeros = np.zeros((1, values.shape[1]))
+    running_total = np.vstack([zeros, np.nancumsum(values, axis=0)])
+    running_days = np.vstack([zeros, np.cumsum(np.asarray(trading_days), axis=0)])
+
+    dates = daily.index
+    event_dates = pd.DatetimeIndex(events['date'])
+    bounded = events['window_days'].notna().to_numpy()
+    window = pd.to_timedelta(events['window_days'].fillna(0).to_numpy(), unit='D')
+    cut = dates.searchsorted(event_dates)
+    start = np.where(bounded, dates.searchsorted(event_dates - window), 0)
+    end = np.where(bounded, dates.searchsorted(event_dates + window), len(dates))
+
+    return pd.DataFrame({
+        'before_total': (running_total[cut] - running_total[start]).ravel(),
+        'after_total': (running_total[end] - running_total[cut]).ravel(),
+        'before_days': (running_days[cut] - running_days[start]).ravel().astype(np.int64),
+        'after_days': (running_days[end] - running_days[cut]).ravel().astype(np.int64),
+    }, index=pd.MultiIndex.from_product([events['id'], daily.columns], names=['event', 'region']))
+
+
+def event_impact_from_sums(sums):
+    """
+    Add daily means and the percent change of the mean to event_window_sums
+    output. Rows without sales on either side are all zero.
+    """
+    with np.errstate(divide='ignore', invalid='ignore'):
+        before_avg = sums['before_total'] / sums['before_days']
+        after_avg = sums['after_total'] / sums['after_days']
+        percent_change = (after_avg - before_avg) / before_avg * 100
+
+    table = pd.DataFrame({
+        'before_avg': before_avg,
+        'after_avg': after_avg,
+        'before_total': sums['before_total'],
+        'after_total': sums['after_total'],
+        'before_days': sums['before_days'],
+        'after_days': sums['after_days'],
+        'percent_change': percent_change,
+    })
+    table.loc[(table['before_days'] == 0) | (table['after_days'] == 0)] = 0
+    return table
+
+
+def event_impact_table(rollup, events):
+    """
+    Before/after statistics of daily sales for every event and every region
+    (plus 'all'): totals, trading days, daily means and the percent change of
+    the mean, indexed by (event id, region). See event_window_sums.
+    """
+    return event_impact_from_sums(event_window_sums(with_total(rollup), events))
+
+
+def apply_new_sales(rollup, sums, events, new_sales):
+    """
+    Fold new transactions into a daily rollup and its event_window_sums,
+    returning the updated (rollup, sums).
+
+    Only the days the new rows fall on are aggregated: their totals are added
+    to the window sums of every event, and a day that had no sales before
+    counts as a new trading day. The cost grows with the new rows, not with
+    the history, apart from merging the new days into the (dates x regions)
+    rollup.
+    """
+    added = build_daily_rollup(new_sales)
+    columns = rollup.columns.union(added.columns)
+    added = added.reindex(columns=columns)
+    previous = with_total(rollup.reindex(index=added.index, columns=columns))
+    added = with_total(added)
+    new_days = (previous.isna() & added.notna()).to_numpy()
+
+    # Keep event order and the region order of event_window_sums, including new regions
+    index = pd.MultiIndex.from_product([events['id'], added.columns], names=['event', 'region'])
+    sums = sums.add(event_window_sums(added, events, new_days), fill_value=0).reindex(index, fill_value=0)
+    sums[['before_days', 'after_days']] = sums[['before_days', 'after_days']].astype(np.int64)
+    return rollup.add(added.drop(columns='all'), fill_value=0), sums
+
+
+def period_stats_table(rollup, split_at):
+    """
+    Before/after statistics for every region, plus 'all', around a single
+    date over the whole history; see event_impact_table.
+    """
+    event = pd.DataFrame({'id': ['split'], 'date': [split_at], 'window_days': [np.nan]})
+    return event_impact_table(rollup, event).loc['split']
+
+
+# Columns of period_stats_table, also the keys of DateIndexedSales.period_stats
+PERIOD_STATS_KEYS = ('before_avg', 'after_avg', 'before_total', 'after_total',
+                     'before_days', 'after_days', 'percent_change')
+
+
+class DateIndexedSales:
+    """
+    Transaction sales partitioned by lower-cased region, plus an 'all'
+    partition, with each partition sorted by date.
+
+    Every partition keeps its row dates, a deduplicated index of its trading
+    days with the row offset at which each day starts, and running sales
+    totals. Date windows are found by binary search and returned as contiguous
+    slices of the sorted arrays, so nothing is copied or masked and a
+    before/after split costs two lookups however many rows there are. Windows
+    are half-open: start <= date < end.
+    """
+
+    def __init__(self, df):
+        codes, names = region_codes(df['Region'])
+        dates = df['Date'].to_numpy()
+        sales = df['Sales'].to_numpy(dtype=float)
+
+        self._partitions = {'all': self._partition(dates, sales, np.argsort(dates, kind='stable'))}
+        order = np.lexsort((dates, codes))
+        bounds = np.searchsorted(codes[order], np.arange(len(names) + 1))
+        for code, name in enumerate(names):
+            self._partitions[name] = self._partition(dates, sales, order[bounds[code]:bounds[code + 1]])
+
+    @staticmethod
+    def _partition(dates, sales, order):
+        dates = dates[order]
+        sales = sales[order]
+        starts = np.flatnonzero(np.concatenate([[True], dates[1:] != dates[:-1]]))
+        return {
+            'dates': dates,
+            'sales': sales,
+            'days': dates[starts],
+            'offsets': np.append(starts, len(dates)),
+            'running': np.concatenate([[0.0], np.cumsum(sales)]),
+        }
+
+    @property
+    def regions(self):
+        return [name for name in self._partitions if name != 'all']
+
+    def _get(self, region):
+        return self._partitions.get(region.lower())
+
+    @staticmethod
+    def _position(values, date, default):
+        if date is None:
+            return default
+        return int(values.searchsorted(np.datetime64(pd.Timestamp(date)), side='left'))
+
+    def window(self, region='all', start=None, end=None):
+        """Transaction sales for a region between start and end, in date order."""
+        part = self._get(region)
+        if part is None:
+            return pd.Series(dtype=float, index=pd.DatetimeIndex([]), name='Sales')
+        lo = self._position(part['dates'], start, 0)
+        hi = self._position(part['dates'], end, len(part['dates']))
+        return pd.Series(part['sales'][lo:hi], index=pd.DatetimeIndex(part['dates'][lo:hi]),
+                         name='Sales', copy=False)
+
+    def daily(self, region='all', start=None, end=None):
+        """Daily sales totals for a region between start and end, from the running totals."""
+        part = self._get(region)
+        if part is None:
+            return pd.Series(dtype=float, index=pd.DatetimeIndex([]), name='Sales')
+        lo = self._position(part['days'], start, 0)
+        hi = self._position(part['days'], end, len(part['days']))
+        totals = np.diff(part['running'][part['offsets'][lo:hi + 1]])
+        return pd.Series(totals, index=pd.DatetimeIndex(part['days'][lo:hi]), name='Sales')
+
+    def period_stats(self, split_at, region='all'):
+        """
+        Before/after statistics of daily sales for a region around split_at, in
+        the layout of period_stats_table. All zero if either side has no sales.
+        """
+        part = self._get(region)
+        if part is None:
+            return dict.fromkeys(PERIOD_STATS_KEYS, 0)
+        row = self._position(part['dates'], split_at, 0)
+        before_days = self._position(part['days'], split_at, 0)
+        after_days = len(part['days']) - before_days
+        if before_days == 0 or after_days == 0:
+            return dict.fromkeys(PERIOD_STATS_KEYS, 0)
+
+        before_total = float(part['running'][row])
+        after_total = float(part['running'][-1]) - before_total
+        before_avg = before_total / before_days
+        after_avg = after_total / after_days
+        return {
+            'before_avg': before_avg,
+            'after_avg': after_avg,
+            'before_total': before_total,
+            'after_total': after_total,
+            'before_days': before_days,
+            'after_days': after_days,
+            'percent_change': (after_avg - before_avg) / before_avg * 100,
+        }
+
+
+def region_box_stats(df, outlier_sample=50):
+    """
+    Box-plot statistics of transaction Sales per region, in order of first
+    appearance: quartiles, Tukey whiskers (the furthest values within 1.5 IQR
+    of the box), mean, row count and up to `outlier_sample` outliers spread
+    across their range. A figure built from these has a fixed size however
+    many rows there are.
+    """
+    rows = []
+    for region, sales in df.groupby('Region', sort=False, observed=True)['Sales']:
+        values = sales.to_numpy(dtype=float)
+        q1, median, q3 = np.quantile(values, [0.25, 0.5, 0.75])
+        low, high = q1 - 1.5 * (q3 - q1), q3 + 1.5 * (q3 - q1)
+        inside = values[(values >= low) & (values <= high)]
+
+        outliers = np.sort(values[(values < low) | (values > high)])
+        if len(outliers) > outlier_sample:
+            keep = np.linspace(0, len(outliers) - 1, outlier_sample).round().astype(np.int64)
+            outliers = outliers[keep]
+
+        rows.append({
+            'Region': str(region),
+            'q1': q1,
+            'median': median,
+            'q3': q3,
+            'lowerfence': inside.min(),
+            'upperfence': inside.max(),
+            'mean': values.mean(),
+            'count': len(values),
+            'outliers': outliers.tolist(),
+        })
+    return pd.DataFrame(rows)
+
+
+def lttb_indices(x, y, n_out):
+    """
+    Positions of the points kept by Largest-Triangle-Three-Buckets downsampling
+    of (x, y) to n_out points. The first and last points are always kept.
+    """
+    n = len(x)
+    if n_out >= n or n_out < 3:
+        return np.arange(n)
+
+    x = np.asarray(x, dtype=float)
+    y = np.asarray(y, dtype=float)
+    # Interior points split into n_out - 2 buckets; the last point is its own bucket
+    edges = np.append(np.linspace(1, n - 1, n_out - 1).astype(np.int64)[:-1], [n - 1, n])
+
+    kept = np.empty(n_out, dtype=np.int64)
+    kept[0], kept[-1] = 0, n - 1
+    a = 0
+    for i in range(n_out - 2):
+        start, end = edges[i], edges[i + 1]
+        next_x = x[end:edges[i + 2]].mean()
+        next_y = y[end:edges[i + 2]].mean()
+        # Twice the area of the triangle (point a, candidate, next bucket average)
+        area = np.abs((x[a] - next_x) * (y[start:end] - y[a])
+                      - (x[a] - x[start:end]) * (next_y - y[a]))
+        a = start + int(np.argmax(area))
+        kept[i + 1] = a
+    return kept
+
+
+def minmax_indices(y, n_out):
+    """
+    Positions of the points kept by min-max bucketing: the first and last
+    points plus the lowest and highest value of each of (n_out - 2) // 2 buckets.
+    """
+    n = len(y)
+    if n_out >= n or n_out < 4:
+        return np.arange(n)
+
+    y = np.asarray(y, dtype=float)
+    edges = np.linspace(0, n, (n_out - 2) // 2 + 1).astype(np.int64)
+    kept = [0, n - 1]
+    for start, end in zip(edges[:-1], edges[1:]):
+        if end > start:
+            kept.append(start + int(np.argmin(y[start:end])))
+            kept.append(start + int(np.argmax(y[start:end])))
+    return np.unique(kept)
+
+
+def downsample(series, max_points, method='lttb', split_at=None):
+    """
+    Reduce a date-indexed series to at most about max_points points for plotting.
+
+    When split_at is given, the points before and after that date are
+    downsampled separately, with points shared in proportion to their length.
+    No bucket straddles the boundary, so the shape on either side of it
+    (e.g. the price increase) is preserved.
+    """
+    if max_points is None or len(series) <= max_points:
+        return series
+    if method not in ('lttb', 'minmax'):
+        raise ValueError(f"Unknown downsampling method: {method!r}")
+
+    if split_at is not None:
+        cut = series.index.searchsorted(split_at)
+        before, after = series.iloc[:cut], series.iloc[cut:]
+        if len(before) and len(after):
+            before_points = max(4, round(max_points * len(before) / len(series)))
+            return pd.concat([
+                downsample(before, before_points, method),
+                downsample(after, max(4, max_points - before_points), method),
+            ])
+
+    if method == 'lttb':
+        kept = lttb_indices(series.index.asi8, series.to_numpy(), max_points)
+    else:
+        kept = minmax_indices(series.to_numpy(), max_points)
+    return series.iloc[kept]
+
+
+# Pyramid levels from finest to coarsest, with the pandas period used to bucket days
+PYRAMID_LEVELS = (('daily', None), ('weekly', 'W'), ('monthly', 'M'))
+
+
+def build_resolution_pyramid(rollup, split_at=None):
+    """
+    Build daily, weekly and monthly views of the rollup, each holding the mean
+    daily sales per period for every region plus an 'all' column.
+
+    Coarser periods are labelled with their first trading day. When split_at
+    is given (a date or a list of dates), a period containing one of those dates
+    is split there, so no point mixes sales from both sides of it.
+    """
+    daily = with_total(rollup)
+    pyramid = {'daily': daily}
+    for level, period in PYRAMID_LEVELS[1:]:
+        pyramid[level] = period_means(daily, period, split_at)
+    return pyramid
+
+
+def period_means(daily, period, split_at=None):
+    """Mean daily sales per period (split at split_at) of a daily pyramid level; see build_resolution_pyramid."""
+    keys = [daily.index.to_period(period)]
+    if split_at is not None:
+        boundaries = np.sort(pd.DatetimeIndex(np.atleast_1d(split_at)).to_numpy())
+        keys.append(np.searchsorted(boundaries, daily.index.to_numpy(), side='right'))
+    sums = daily.groupby(keys).sum(min_count=1)
+    days = daily.notna().groupby(keys).sum()
+    means = sums / days.where(days > 0)
+    means.index = pd.DatetimeIndex(daily.index.to_series().groupby(keys).min().to_numpy(),
+                                   name=daily.index.name)
+    return means
+
+
+def rows_in_periods(index, periods):
+    """Positions of the dates of a sorted DatetimeIndex that fall in any of the given periods."""
+    starts = index.searchsorted(periods.start_time)
+    ends = index.searchsorted(periods.end_time, side='right')
+    return np.concatenate([np.arange(start, end) for start, end in zip(starts, ends)])
+
+
+def replace_rows(frame, drop, rows):
+    """frame without the rows at positions drop, plus rows, in date order."""
+    keep = np.ones(len(frame), dtype=bool)
+    keep[drop] = False
+    return pd.concat([frame[keep].reindex(columns=rows.columns), rows]).sort_index(kind='stable')
+
+
+def update_resolution_pyramid(pyramid, rollup, dates, split_at=None):
+    """
+    The build_resolution_pyramid of an updated rollup, given the pyramid of
+    the previous one and the dates whose daily totals changed (e.g. by
+    apply_new_sales). Only those days and the weekly and monthly periods
+    containing them are re-aggregated; every other period is reused.
+    """
+    dates = pd.DatetimeIndex(dates).unique().sort_values()
+    if len(dates) == 0:
+        return pyramid
+
+    previous = pyramid['daily'].index.get_indexer(dates)
+    updated = {'daily': replace_rows(pyramid['daily'], previous[previous >= 0],
+                                     with_total(rollup.loc[dates]))}
+    for level, period in PYRAMID_LEVELS[1:]:
+        periods = dates.to_period(period).unique()
+        touched = updated['daily'].iloc[rows_in_periods(updated['daily'].index, periods)]
+        updated[level] = replace_rows(pyramid[level], rows_in_periods(pyramid[level].index, periods),
+                                      period_means(touched, period, split_at))
+    return updated
+
+
+def pyramid_series(pyramid, selected_region='all', start=None, end=None, max_points=400):
+    """
+    Return (level, series) for the finest pyramid level that has at most
+    max_points points between start and end (always daily if max_points is
+    None), falling back to the coarsest.
+    The date window is sliced by binary search on the sorted index.
+    """
+    column = selected_region.lower()
+    for level, _ in PYRAMID_LEVELS:
+        frame = pyramid[level]
+        if column not in frame.columns:
+            return level, pd.Series(dtype=float, index=frame.index[:0], name='Sales')
+        window = frame[column].loc[start:end].dropna()
+        if max_points is None or len(window) <= max_points:
+            break
+    return level, window.rename('Sales')
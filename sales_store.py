@@ -0,0 +1,162 @@
+"""
+Lazily loaded, thread-safe access to the data behind the dashboards.
+"""
+import threading
+
+
+class LazyDataset:
+    """
+    Build a value on first use and share it between threads.
+
+    `factory` runs under a lock the first time get() is called, so concurrent
+    first requests trigger a single load; later calls return the cached value
+    without locking. reset() drops the value so the next get() rebuilds it.
+    """
+
+    def __init__(self, factory):
+        self._factory = factory
+        self._value = None
+        self._lock = threading.Lock()
+
+    @property
+    def loaded(self):
+        return self._value is not None
+
+    def get(self):
+        value = self._value
+        if value is None:
+            with self._lock:
+                if self._value is None:
+                    self._value = self._factory()
+                value = self._value
+        return value
+
+    def reset(self):
+        with self._lock:
+            self._value = None
+
+
+class WatchedDataset:
+    """
+    A lazily built value paired with the version of the source it was built
+    from, e.g. a consolidated file's fingerprint.
+
+    snapshot() returns the current (version, value) pair. Callers that key
+    caches on that version and read that value always see a consistent pair.
+    refresh() rebuilds the value when `version()` has moved on and swaps the
+    new pair in with a single assignment. Until the new value is complete,
+    readers keep getting the old one, so a reload never blocks or breaks a
+    request. Callbacks registered with on_reload run after each swap.
+    """
+
+    def __init__(self, factory, version):
+        self._factory = factory
+        self._version = version
+        self._snapshot = None
+        self._lock = threading.Lock()
+        self._listeners = []
+
+    @property
+    def loaded(self):
+        return self._snapshot is not None
+
+    def snapshot(self):
+        snapshot = self._snapshot
+        if snapshot is None:
+            with self._lock:
+                if self._snapshot is None:
+                    # Read the version first: a change during the load triggers another refresh
+                    version = self._version()
+                    self._snapshot = (version, self._factory())
+                snapshot = self._snapshot
+        return snapshot
+
+    def get(self):
+        return self.snapshot()[1]
+
+    def reset(self):
+        with self._lock:
+            self._snapshot = None
+
+    def on_reload(self, callback):
+        self._listeners.append(callback)
+
+    def refresh(self):
+        """Rebuild and swap in the value if the source changed; True if it was swapped."""
+        if self._snapshot is None or self._version() == self._snapshot[0]:
+            return False
+        with self._lock:
+            version = self._version()
+            if self._snapshot is None or version == self._snapshot[0]:
+                return False
+            self._snapshot = (version, self._factory())
+        for callback in self._listeners:
+            callback()
+        return True
+
+    def update(self, apply):
+        """
+        Swap in apply(value), paired with the version read after apply returns.
+
+        For changes made in place of a reload, e.g. appending rows to the
+        source and folding them into the value: the new version then matches
+        the snapshot, so refresh() does not rebuild it. Runs under the same
+        lock as reloads, so concurrent updates are applied one at a time.
+        """
+        with self._lock:
+            if self._snapshot is None:
+                version = self._version()
+                self._snapshot = (version, self._factory())
+            value = apply(self._snapshot[1])
+            self._snapshot = (self._version(), value)
+        for callback in self._listeners:
+            callback()
+        return value
+
+
+class DatasetWatcher:
+    """
+    Refresh datasets from a daemon thread every `interval` seconds.
+
+    `datasets` is a callable returning the WatchedDatasets to check, so
+    datasets created after the watcher started are picked up. A failed reload
+    is reported and retried on the next poll while the old value stays in
+    service.
+    """
+
+    def __init__(self, datasets, interval=5.0):
+        self._datasets = datasets
+        self.interval = interval
+        self._stop = threading.Event()
+        self._thread = None
+        self._lock = threading.Lock()
+
+    @property
+    def running(self):
+        return self._thread is not None and self._thread.is_alive()
+
+    def start(self):
+        with self._lock:
+            if not self.running:
+                self._stop.clear()
+                self._thread = threading.Thread(target=self._run, name='dataset-watcher', daemon=True)
+                self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+
+    def poll(self):
+        """Refresh every dataset once; returns how many were reloaded."""
+        reloaded = 0
+        for dataset in list(self._datasets()):
+            try:
+                reloaded += dataset.refresh()
+            except Exception as e:
+                print(f"Warning: reloading dataset failed, keeping the current data: {e}")
+        return reloaded
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            self.poll()
@@ -276,8 +276,9 @@ def test_manual_verification():
     try:
         import dash_app
 
-        # Check that key components exist in the app layout
-        layout_str = str(dash_app.app.layout)
+        # Check that key components exist in the app layout (served by a layout function)
+        layout = dash_app.app.layout
+        layout_str = str(layout() if callable(layout) else layout)
 
         # Check for key elements with more flexible matching
         checks = {
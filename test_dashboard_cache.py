@@ -0,0 +1,121 @@
+import os
+import sqlite3
+import sys
+import time
+from contextlib import closing
+
+import pytest
+
+# Add current directory to path for imports
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from dashboard_cache import LRUCache, SQLiteCache, make_cache
+
+
+def test_lru_cache_evicts_least_recently_used():
+    cache = LRUCache(maxsize=2)
+    cache.set('north', 1)
+    cache.set('south', 2)
+    assert cache.get('north') == 1
+
+    cache.set('east', 3)
+    assert cache.get('south') is None
+    assert cache.get('north') == 1
+    assert cache.get('east') == 3
+    assert cache.stats() == {'hits': 3, 'misses': 1, 'size': 2, 'maxsize': 2}
+
+
+def test_get_or_compute_only_computes_on_miss():
+    cache = LRUCache(maxsize=4)
+    calls = []
+
+    def compute():
+        calls.append(1)
+        return 'figure'
+
+    assert cache.get_or_compute(('all', 'v1'), compute) == 'figure'
+    assert cache.get_or_compute(('all', 'v1'), compute) == 'figure'
+    assert cache.get_or_compute(('all', 'v2'), compute) == 'figure'
+    assert len(calls) == 2
+    assert cache.stats()['hits'] == 1
+
+
+def test_lru_cache_rejects_empty_size():
+    with pytest.raises(ValueError):
+        LRUCache(maxsize=0)
+
+
+def test_sqlite_cache_is_shared_between_instances(tmp_path):
+    path = tmp_path / "cache.sqlite"
+    writer = SQLiteCache(path)
+    writer.set(('north', ('v1',)), {'figure': [1, 2, 3]})
+
+    # A second instance stands in for another worker process on the host
+    reader = SQLiteCache(path)
+    assert reader.get(('north', ('v1',))) == {'figure': [1, 2, 3]}
+    assert reader.get(('south', ('v1',))) is None
+    assert reader.stats() == {'hits': 1, 'misses': 1, 'size': 1, 'maxsize': 256}
+
+
+def test_sqlite_cache_evicts_least_recently_used(tmp_path):
+    cache = SQLiteCache(tmp_path / "cache.sqlite", maxsize=2)
+    cache.set('north', 1)
+    time.sleep(0.01)
+    cache.set('south', 2)
+    time.sleep(0.01)
+    assert cache.get('north') == 1
+    time.sleep(0.01)
+
+    cache.set('east', 3)
+    assert cache.get('south') is None
+    assert cache.get('north') == 1
+    assert cache.stats()['size'] == 2
+
+
+def test_sqlite_cache_expires_entries(tmp_path):
+    cache = SQLiteCache(tmp_path / "cache.sqlite", ttl=0.05)
+    assert cache.get_or_compute('all', lambda: 'first') == 'first'
+    assert cache.get_or_compute('all', lambda: 'second') == 'first'
+
+    time.sleep(0.1)
+    assert cache.get_or_compute('all', lambda: 'third') == 'third'
+
+
+def test_sqlite_cache_opens_a_connection_per_process(tmp_path, monkeypatch):
+    cache = SQLiteCache(tmp_path / "cache.sqlite")
+    # The constructor's connection is closed, so a forked worker cannot inherit it
+    assert getattr(cache._local, 'conn', None) is None
+
+    cache.set('north', 1)
+    conn = cache._connect()
+    assert cache._connect() is conn
+
+    parent_pid = os.getpid()
+    monkeypatch.setattr(os, 'getpid', lambda: parent_pid + 1)
+    assert cache._connect() is not conn
+    assert cache.get('north') == 1
+
+
+def test_sqlite_cache_batches_access_time_updates(tmp_path):
+    path = tmp_path / "cache.sqlite"
+    cache = SQLiteCache(path, touch_interval=60)
+    cache.set('north', 1)
+
+    def accessed_at(key):
+        with closing(sqlite3.connect(path)) as conn:
+            return conn.execute("SELECT accessed_at FROM cache WHERE key = ?", (repr(key),)).fetchone()[0]
+
+    written = accessed_at('north')
+    time.sleep(0.01)
+    assert cache.get('north') == 1
+    assert cache.get('north') == 1
+    assert accessed_at('north') == written
+
+    # The next write records the pending hits in its own transaction
+    cache.set('south', 2)
+    assert accessed_at('north') > written
+
+
+def test_make_cache_picks_backend(tmp_path):
+    assert isinstance(make_cache(), LRUCache)
+    assert isinstance(make_cache(tmp_path / "cache.sqlite"), SQLiteCache)
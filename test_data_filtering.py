@@ -0,0 +1,491 @@
+import json
+import os
+import sys
+
+import numpy as np
+import pandas as pd
+import pytest
+
+# Add current directory to path for imports
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+import Data_filtering
+
+
+RAW_ROWS = [
+    ('pink morsel', '$3.00', 546, '2018-02-06', 'north'),
+    ('gold morsel', '$9.99', 580, '2018-02-06', 'west'),
+    ('pink morsel', '$3.00', 549, '2018-02-06', 'south'),
+    ('Pink Morsel', '$3.00', 577, '2018-02-07', 'east'),
+    ('lapis morsel', '$4.99', 600, '2018-02-07', 'north'),
+    ('pink morsel', '$5.00', 519, '2021-01-15', 'west'),
+    ('pink morsel', '$5.00', 520, '2021-01-16', 'north'),
+]
+
+
+@pytest.fixture
+def raw_files(tmp_path):
+    """Write the sample rows split across two daily sales files."""
+    columns = ['product', 'price', 'quantity', 'date', 'region']
+    paths = []
+    for i, rows in enumerate([RAW_ROWS[:4], RAW_ROWS[4:]]):
+        path = tmp_path / f"daily_sales_data_{i}.csv"
+        pd.DataFrame(rows, columns=columns).to_csv(path, index=False)
+        paths.append(str(path))
+    return paths
+
+
+def test_process_sales_data_filters_pink_morsel(raw_files, tmp_path):
+    output = tmp_path / "out.csv"
+    result = Data_filtering.process_sales_data(raw_files, str(output))
+
+    assert list(result.columns) == ['Sales', 'Date', 'Region']
+    assert len(result) == 5
+    assert result['Sales'].tolist() == [1638.0, 1647.0, 1731.0, 2595.0, 2600.0]
+    assert pd.read_csv(output, parse_dates=['Date']).equals(result)
+
+
+@pytest.mark.parametrize('backend', ['infer', 'pandas', 'pyarrow'])
+def test_streaming_matches_batch_output(raw_files, tmp_path, backend):
+    if backend == 'pyarrow':
+        pytest.importorskip('pyarrow')
+    batch = Data_filtering.process_sales_data(raw_files, str(tmp_path / "batch.csv"))
+    rows = Data_filtering.process_sales_data_streaming(
+        raw_files, str(tmp_path / "stream.csv"), chunksize=2, backend=backend
+    )
+
+    streamed = pd.read_csv(tmp_path / "stream.csv", parse_dates=['Date'])
+    assert rows == len(batch)
+    assert streamed.equals(batch)
+    assert not os.path.exists(tmp_path / "stream.csv.tmp")
+
+
+def test_streaming_warns_about_out_of_order_input(raw_files, tmp_path, capsys):
+    Data_filtering.process_sales_data_streaming(raw_files[::-1], str(tmp_path / "stream.csv"))
+    assert "out of date order" in capsys.readouterr().out
+
+    Data_filtering.process_sales_data_streaming(raw_files, str(tmp_path / "stream.csv"))
+    assert "out of date order" not in capsys.readouterr().out
+
+
+def test_streaming_without_inputs_raises(tmp_path):
+    with pytest.raises(FileNotFoundError):
+        Data_filtering.process_sales_data_streaming(
+            [str(tmp_path / "missing.csv")], str(tmp_path / "out.csv")
+        )
+
+
+@pytest.mark.parametrize('argv', [
+    ['--chunksize', '10', '--workers', '4'],
+    ['--async-io', '--workers', '4'],
+    ['--chunksize', '10', '--async-io'],
+    ['--incremental', '--partitioned'],
+    ['--concurrency', '4'],
+    ['--content-hash'],
+    ['--cache-dir', 'cache'],
+    ['--product-dir', 'products'],
+    ['--dataset-dir', 'dataset'],
+    ['--async-io', '--concurrency', '0'],
+])
+def test_conflicting_flags_are_rejected(argv):
+    with pytest.raises(SystemExit):
+        Data_filtering.parse_args(argv)
+
+
+def test_mode_options_default_when_their_mode_is_on():
+    args = Data_filtering.parse_args(['--async-io'])
+    assert args.concurrency == 16
+
+    args = Data_filtering.parse_args(['--incremental', '--cache-dir', 'cache'])
+    assert args.cache_dir == 'cache'
+
+    args = Data_filtering.parse_args(['--all-products', '--partitioned'])
+    assert args.product_dir == Data_filtering.PRODUCT_SALES_DIR
+    assert args.dataset_dir == Data_filtering.SALES_DATASET_DIR
+
+
+def test_parse_prices_matches_parse_price():
+    prices = pd.Series(['$3.00', 4, 5.5, None, '$9.99', '$3.00'], dtype=object)
+    parsed = Data_filtering.parse_prices(prices)
+
+    expected = [Data_filtering.parse_price(p) if p is not None else None for p in prices]
+    assert parsed.tolist()[:3] == expected[:3]
+    assert pd.isna(parsed.iloc[3])
+    assert parsed.tolist()[4:] == expected[4:]
+
+
+def test_parse_prices_reports_malformed_values():
+    prices = pd.Series(['$3.00', 'free', '$x', 'free'])
+
+    with pytest.raises(ValueError, match="3 malformed"):
+        Data_filtering.parse_prices(prices)
+
+    coerced = Data_filtering.parse_prices(prices, errors='coerce')
+    assert coerced.iloc[0] == 3.0
+    assert coerced.iloc[1:].isna().all()
+
+
+def test_parallel_matches_serial(raw_files, tmp_path):
+    serial = Data_filtering.process_sales_data(raw_files, str(tmp_path / "serial.csv"))
+    parallel = Data_filtering.process_sales_data(
+        raw_files, str(tmp_path / "parallel.csv"), workers=2
+    )
+
+    assert parallel.equals(serial)
+    assert (tmp_path / "parallel.csv").read_bytes() == (tmp_path / "serial.csv").read_bytes()
+
+
+def test_incremental_skips_unchanged_files(raw_files, tmp_path, capsys):
+    cache_dir = tmp_path / "cache"
+    output = str(tmp_path / "out.csv")
+    full = Data_filtering.process_sales_data(raw_files, str(tmp_path / "full.csv"))
+
+    first = Data_filtering.process_sales_data_incremental(raw_files, output, cache_dir=cache_dir)
+    assert "2 of 2 files" in capsys.readouterr().out
+    assert first.equals(full)
+
+    second = Data_filtering.process_sales_data_incremental(raw_files, output, cache_dir=cache_dir)
+    assert "0 of 2 files" in capsys.readouterr().out
+    assert second.equals(full)
+
+
+def test_incremental_reprocesses_changed_file(raw_files, tmp_path, capsys):
+    cache_dir = tmp_path / "cache"
+    output = str(tmp_path / "out.csv")
+    Data_filtering.process_sales_data_incremental(raw_files, output, cache_dir=cache_dir)
+
+    with open(raw_files[1], 'a') as f:
+        f.write("pink morsel,$5.00,10,2021-01-17,south\n")
+    capsys.readouterr()
+
+    result = Data_filtering.process_sales_data_incremental(raw_files, output, cache_dir=cache_dir)
+    assert "1 of 2 files" in capsys.readouterr().out
+    assert result.equals(Data_filtering.process_sales_data(raw_files, str(tmp_path / "full.csv")))
+
+
+def test_incremental_redoes_partials_from_another_format_or_backend(raw_files, tmp_path, capsys):
+    cache_dir = tmp_path / "cache"
+    output = str(tmp_path / "out.csv")
+    Data_filtering.process_sales_data_incremental(raw_files, output, cache_dir=cache_dir, backend='pandas')
+
+    Data_filtering.process_sales_data_incremental(raw_files, output, cache_dir=cache_dir, backend='infer')
+    assert "2 of 2 files" in capsys.readouterr().out
+
+    # Partials cached before the current format version are not reused
+    manifest_file = cache_dir / "manifest.json"
+    manifest = json.loads(manifest_file.read_text())
+    manifest[os.path.abspath(raw_files[0])]['format'] = Data_filtering.PARTIAL_FORMAT_VERSION - 1
+    manifest_file.write_text(json.dumps(manifest))
+    Data_filtering.process_sales_data_incremental(raw_files, output, cache_dir=cache_dir, backend='infer')
+    assert "1 of 2 files" in capsys.readouterr().out
+
+
+def test_incremental_content_hash_ignores_touch(raw_files, tmp_path, capsys):
+    cache_dir = tmp_path / "cache"
+    output = str(tmp_path / "out.csv")
+    Data_filtering.process_sales_data_incremental(
+        raw_files, output, cache_dir=cache_dir, content_hash=True
+    )
+
+    stat = os.stat(raw_files[0])
+    os.utime(raw_files[0], ns=(stat.st_atime_ns, stat.st_mtime_ns + 10**9))
+    capsys.readouterr()
+
+    Data_filtering.process_sales_data_incremental(
+        raw_files, output, cache_dir=cache_dir, content_hash=True
+    )
+    assert "0 of 2 files" in capsys.readouterr().out
+
+
+def test_columnar_output_is_typed_and_preferred(raw_files, tmp_path):
+    pytest.importorskip('pyarrow')
+    output = tmp_path / "out.csv"
+    Data_filtering.process_sales_data(raw_files, str(output))
+
+    parquet_file = Data_filtering.write_columnar(str(output))
+    assert parquet_file == tmp_path / "out.parquet"
+
+    from_parquet = pd.read_parquet(parquet_file)
+    assert pd.api.types.is_datetime64_any_dtype(from_parquet['Date'])
+    assert isinstance(from_parquet['Region'].dtype, pd.CategoricalDtype)
+
+    loaded = Data_filtering.read_consolidated(str(output))
+    assert isinstance(loaded['Region'].dtype, pd.CategoricalDtype)
+    assert loaded['Sales'].tolist() == from_parquet['Sales'].tolist()
+
+
+def test_stale_columnar_output_is_ignored(raw_files, tmp_path):
+    pytest.importorskip('pyarrow')
+    output = tmp_path / "out.csv"
+    Data_filtering.process_sales_data(raw_files, str(output))
+    parquet_file = Data_filtering.write_columnar(str(output))
+
+    # A newer CSV (e.g. from a later streaming run) wins over the old Parquet copy
+    with open(output, 'a') as f:
+        f.write("10.0,2021-02-01,north\n")
+    stat = os.stat(parquet_file)
+    os.utime(output, ns=(stat.st_atime_ns, stat.st_mtime_ns + 10**9))
+
+    loaded = Data_filtering.read_consolidated(str(output))
+    assert len(loaded) == len(pd.read_parquet(parquet_file)) + 1
+    assert pd.api.types.is_datetime64_any_dtype(loaded['Date'])
+
+
+def test_arrow_store_is_memory_mapped(tmp_path, monkeypatch):
+    pa = pytest.importorskip('pyarrow')
+    output = tmp_path / "out.csv"
+    rows = 20_000
+    pd.DataFrame({
+        'Sales': [float(i) for i in range(rows)],
+        'Date': pd.date_range('2018-01-01', periods=rows, freq='h').strftime('%Y-%m-%d'),
+        'Region': ['north', 'south', 'east', 'west'] * (rows // 4),
+    }).to_csv(output, index=False)
+
+    arrow_file = Data_filtering.write_arrow_store(str(output))
+    mappings = []
+    open_mapping = pa.memory_map
+
+    def memory_map(path):
+        mappings.append(open_mapping(path))
+        return mappings[-1]
+
+    monkeypatch.setattr(Data_filtering.pa, 'memory_map', memory_map)
+    loaded = Data_filtering.read_consolidated(str(output))
+
+    # Every column, Region's codes included, is a view of the mapped file
+    mappings[0].seek(0)
+    mapped = np.frombuffer(mappings[0].read_buffer(), dtype=np.uint8)
+    assert np.shares_memory(loaded['Sales'].to_numpy(), mapped)
+    assert np.shares_memory(loaded['Date'].to_numpy(), mapped)
+    assert np.shares_memory(loaded['Region'].array.codes, mapped)
+    assert arrow_file == tmp_path / "out.arrow"
+    assert loaded['Sales'].tolist() == [float(i) for i in range(rows)]
+    assert pd.api.types.is_datetime64_any_dtype(loaded['Date'])
+    assert list(loaded['Region'].cat.categories) == ['north', 'south', 'east', 'west']
+
+
+def test_consolidated_version_tracks_rewrites(raw_files, tmp_path):
+    output = tmp_path / "out.csv"
+    Data_filtering.process_sales_data(raw_files, str(output))
+    version = Data_filtering.consolidated_version(str(output))
+    assert version == Data_filtering.consolidated_version(str(output))
+
+    stat = os.stat(output)
+    os.utime(output, ns=(stat.st_atime_ns, stat.st_mtime_ns + 10**9))
+    assert Data_filtering.consolidated_version(str(output)) != version
+
+
+def test_consolidated_data_is_read_in_compact_dtypes(tmp_path):
+    output = tmp_path / "out.csv"
+    pd.DataFrame({
+        'Sales': [1638.0, 29.97, 2500.5],
+        'Date': ['2021-01-14', '2021-01-15', '2021-01-15'],
+        'Region': ['north', 'south', 'north'],
+    }).to_csv(output, index=False)
+
+    loaded = Data_filtering.read_consolidated(str(output))
+    assert list(loaded['Region'].cat.categories) == ['north', 'south']
+    assert pd.api.types.is_datetime64_any_dtype(loaded['Date'])
+    # 29.97 has no exact float32 form, so Sales stays float64
+    assert loaded['Sales'].dtype == np.float64
+
+    exact = Data_filtering.compact_sales_frame(loaded.iloc[[0, 2]].copy())
+    assert exact['Sales'].dtype == np.float32
+    assert exact['Sales'].tolist() == [1638.0, 2500.5]
+
+
+def test_regions_are_normalized_at_ingest():
+    raw = pd.DataFrame([('pink morsel', '$3.00', 2, '2021-01-15', ' North ')],
+                       columns=['product', 'price', 'quantity', 'date', 'region'])
+    assert Data_filtering.filter_pink_morsel(raw)['Region'].tolist() == ['north']
+
+
+def test_process_product_sales_writes_every_product_in_one_pass(raw_files, tmp_path):
+    output_dir = tmp_path / "products"
+    paths = Data_filtering.process_product_sales(raw_files, str(output_dir))
+
+    assert list(paths) == ['gold morsel', 'lapis morsel', 'pink morsel']
+    assert Data_filtering.list_products(str(output_dir)) == list(paths)
+    assert paths['gold morsel'] == Data_filtering.product_file('gold morsel', str(output_dir))
+
+    # The Pink Morsel partition matches the single-product pipeline byte for byte
+    Data_filtering.process_sales_data(raw_files, str(tmp_path / "pink.csv"))
+    assert paths['pink morsel'].read_bytes() == (tmp_path / "pink.csv").read_bytes()
+
+    gold = pd.read_csv(paths['gold morsel'])
+    assert list(gold.columns) == ['Sales', 'Date', 'Region']
+    assert gold['Sales'].tolist() == [9.99 * 580]
+
+
+def test_partitioned_dataset_prunes_by_product_date_and_region(raw_files, tmp_path):
+    dataset_dir = tmp_path / "dataset"
+    combined = Data_filtering.consolidate_products(raw_files)
+    manifest = Data_filtering.write_partitioned(combined, str(dataset_dir))
+
+    assert [entry['path'] for entry in manifest['partitions']] == [
+        'generation=000000/product=gold_morsel/year=2018/month=02/part-0.csv',
+        'generation=000000/product=lapis_morsel/year=2018/month=02/part-0.csv',
+        'generation=000000/product=pink_morsel/year=2018/month=02/part-0.csv',
+        'generation=000000/product=pink_morsel/year=2021/month=01/part-0.csv',
+    ]
+    assert Data_filtering.list_partitioned_products(str(dataset_dir)) == [
+        'gold morsel', 'lapis morsel', 'pink morsel'
+    ]
+
+    # A recent window only opens the newest Pink Morsel partition
+    partitions, start = Data_filtering.prune_partitions(manifest, ['pink morsel'], last_days=2)
+    assert [entry['max_date'] for entry in partitions] == ['2021-01-16']
+    recent = Data_filtering.read_partitioned(str(dataset_dir), ['pink morsel'], last_days=2)
+    assert recent['Sales'].tolist() == [5.0 * 519, 5.0 * 520]
+
+    north = Data_filtering.read_partitioned(str(dataset_dir), regions=['north'], end='2020-12-31')
+    assert north['Product'].tolist() == ['lapis morsel', 'pink morsel']
+    assert Data_filtering.read_partitioned(str(dataset_dir), ['gold morsel'], start='2019-01-01').empty
+
+    # The full Pink Morsel history matches the flat consolidated file
+    output = tmp_path / "out.csv"
+    Data_filtering.process_sales_data(raw_files, str(output))
+    full = Data_filtering.read_partitioned(str(dataset_dir), ['pink morsel']).drop(columns='Product')
+    assert full.equals(Data_filtering.read_consolidated(str(output)))
+
+    # Rewrites go to a new generation; the previous one stays for readers of the
+    # old manifest and older ones are deleted
+    pink = combined[combined['Product'] == 'pink morsel']
+    Data_filtering.write_partitioned(pink, str(dataset_dir))
+    assert Data_filtering.list_partitioned_products(str(dataset_dir)) == ['pink morsel']
+    assert all((dataset_dir / entry['path']).exists() for entry in manifest['partitions'])
+    manifest = Data_filtering.write_partitioned(pink, str(dataset_dir))
+    assert manifest['generation'] == 2
+    assert sorted(path.name for path in dataset_dir.iterdir()) == [
+        '_manifest.json', 'generation=000001', 'generation=000002'
+    ]
+
+
+def test_async_reads_match_serial_output(raw_files, tmp_path):
+    serial = tmp_path / "serial.csv"
+    concurrent = tmp_path / "async.csv"
+    Data_filtering.process_sales_data(raw_files, str(serial))
+
+    pattern = str(tmp_path / "daily_sales_data_*.csv")
+    assert Data_filtering.discover_input_files(pattern) == raw_files
+    Data_filtering.process_sales_data_async(output_file=str(concurrent), pattern=pattern, concurrency=1)
+    assert concurrent.read_bytes() == serial.read_bytes()
+
+    # Missing files are skipped, as in the serial path
+    missing = [str(tmp_path / "missing.csv")] + raw_files
+    Data_filtering.process_sales_data_async(missing, str(concurrent))
+    assert concurrent.read_bytes() == serial.read_bytes()
+
+    with pytest.raises(FileNotFoundError):
+        Data_filtering.discover_input_files(str(tmp_path / "nothing_*.csv"))
+
+
+def test_discovered_shards_are_in_numeric_order(tmp_path):
+    for i in (10, 2, 1, 0):
+        (tmp_path / f"daily_sales_data_{i}.csv").write_text('')
+
+    files = Data_filtering.discover_input_files(str(tmp_path / "daily_sales_data_*.csv"))
+    assert [os.path.basename(f) for f in files] == [
+        'daily_sales_data_0.csv', 'daily_sales_data_1.csv',
+        'daily_sales_data_2.csv', 'daily_sales_data_10.csv',
+    ]
+
+
+def test_async_reads_through_a_bounded_queue(raw_files, tmp_path, monkeypatch):
+    serial = tmp_path / "serial.csv"
+    concurrent = tmp_path / "async.csv"
+    Data_filtering.process_sales_data(raw_files, str(serial))
+
+    # Tiny blocks through a one-slot queue: the reader has to wait for the parser
+    monkeypatch.setattr(Data_filtering, 'PREFILTER_BLOCK_SIZE', 16)
+    monkeypatch.setattr(Data_filtering, 'ASYNC_QUEUED_BLOCKS', 1)
+    Data_filtering.process_sales_data_async(raw_files, str(concurrent), concurrency=2)
+    assert concurrent.read_bytes() == serial.read_bytes()
+
+    # A parser that fails mid-file does not leave the reader blocked on the full queue
+    def failing_parser(stream, all_products=False, backend=None):
+        stream.read(1)
+        raise ValueError("bad file")
+
+    monkeypatch.setattr(Data_filtering, 'process_sales_file', failing_parser)
+    with pytest.raises(ValueError, match="bad file"):
+        Data_filtering.process_sales_data_async(raw_files, str(concurrent))
+
+
+def test_pyarrow_backend_without_pyarrow_raises_import_error(raw_files, monkeypatch):
+    # As if pyarrow were not installed: neither module name is bound
+    monkeypatch.setattr(Data_filtering, 'pa', None)
+    monkeypatch.delattr(Data_filtering, 'pa_csv', raising=False)
+
+    with pytest.raises(ImportError):
+        Data_filtering.read_raw_sales(raw_files[0], 'pyarrow')
+    with pytest.raises(ImportError):
+        list(Data_filtering.read_raw_sales_chunks(raw_files[0], 2, 'pyarrow'))
+    with pytest.raises(ImportError):
+        Data_filtering.process_sales_file(raw_files[0], backend='pyarrow')
+
+
+@pytest.mark.parametrize('backend', ['infer', 'pandas', 'pyarrow'])
+def test_csv_backends_produce_identical_output(raw_files, tmp_path, backend):
+    if backend == 'pyarrow':
+        pytest.importorskip('pyarrow')
+    reference = tmp_path / "reference.csv"
+    output = tmp_path / f"{backend}.csv"
+    Data_filtering.process_sales_data(raw_files, str(reference), backend='infer')
+    Data_filtering.process_sales_data(raw_files, str(output), backend=backend)
+    assert output.read_bytes() == reference.read_bytes()
+
+    raw = Data_filtering.read_raw_sales(raw_files[0], backend)
+    assert sorted(raw.columns) == sorted(Data_filtering.RAW_SALES_COLUMNS)
+    if backend != 'infer':
+        assert pd.api.types.is_datetime64_any_dtype(raw['date'])
+        assert isinstance(raw['region'].dtype, pd.CategoricalDtype)
+
+    with pytest.raises(ValueError):
+        Data_filtering.read_raw_sales(raw_files[0], 'polars')
+
+
+@pytest.mark.parametrize('backend', ['infer', 'pandas', 'pyarrow'])
+def test_product_predicate_is_applied_while_reading(tmp_path, backend):
+    if backend == 'pyarrow':
+        pytest.importorskip('pyarrow')
+    path = tmp_path / "daily_sales_data_0.csv"
+    path.write_text(
+        "product,price,quantity,date,region\n"
+        "pink morsel,$3.00,546,2018-02-06,north\n"
+        "gold morsel,$9.99,580,2018-02-06,west\n"
+        '" Pink Morsel ",$3.00,577,2018-02-07,east\n'
+        "\n"
+        "lapis morsel,$4.99,600,2018-02-07,north\n"
+    )
+
+    df, row_count, products = Data_filtering.read_raw_product_rows(str(path), ['pink morsel'], backend)
+    assert len(df) == 2
+    assert df['quantity'].tolist() == [546, 577]
+    assert row_count == 4
+    assert [p.strip() for p in products] == ['pink morsel', 'gold morsel', 'Pink Morsel', 'lapis morsel']
+
+    # Files that do not lead with the product column are parsed whole
+    reordered = tmp_path / "reordered.csv"
+    pd.read_csv(path).iloc[:, [4, 0, 1, 2, 3]].to_csv(reordered, index=False)
+    df, row_count, _ = Data_filtering.read_raw_product_rows(str(reordered), ['pink morsel'], backend)
+    assert row_count == 4
+    assert len(Data_filtering.filter_pink_morsel(df)) == 2
+
+
+def test_cold_start_builds_consolidated_file(raw_files, tmp_path):
+    output = tmp_path / "consolidated.csv"
+    expected = Data_filtering.process_sales_data(raw_files, str(tmp_path / "etl.csv"))
+    # Another worker's build in progress is neither reused nor truncated
+    (tmp_path / "consolidated.csv.tmp").write_text("partial")
+
+    cold = Data_filtering.load_consolidated(str(output), raw_files)
+    assert output.read_bytes() == (tmp_path / "etl.csv").read_bytes()
+    assert (tmp_path / "consolidated.csv.tmp").read_text() == "partial"
+    assert sorted(p.name for p in tmp_path.glob("*.tmp")) == ["consolidated.csv.tmp"]
+    assert cold.equals(Data_filtering.read_consolidated(str(output)))
+    assert cold['Sales'].tolist() == expected['Sales'].tolist()
+
+    # Once written, the file is read rather than rebuilt
+    output.write_text("Sales,Date,Region\n1.0,2021-01-15,north\n")
+    assert len(Data_filtering.load_consolidated(str(output), raw_files)) == 1
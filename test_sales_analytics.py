@@ -0,0 +1,244 @@
+import os
+import sys
+
+import numpy as np
+import pandas as pd
+import pytest
+
+# Add current directory to path for imports
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+import sales_analytics
+
+
+@pytest.fixture
+def sales_df():
+    """Transaction-level sales in the consolidated layout, with mixed-case regions."""
+    return pd.DataFrame({
+        'Sales': [100.0, 200.0, 50.0, 300.0, 400.0, 25.0, 75.0],
+        'Date': pd.to_datetime([
+            '2021-01-13', '2021-01-13', '2021-01-13', '2021-01-14',
+            '2021-01-15', '2021-01-15', '2021-01-16',
+        ]),
+        'Region': ['north', 'south', 'North', 'south', 'north', 'east', 'east'],
+    })
+
+
+def test_daily_rollup_matches_raw_groupby(sales_df):
+    rollup = sales_analytics.build_daily_rollup(sales_df)
+
+    assert sorted(rollup.columns) == ['east', 'north', 'south']
+    assert rollup.loc['2021-01-13', 'north'] == 150.0
+    assert pd.isna(rollup.loc['2021-01-14', 'north'])
+
+    expected = sales_df.groupby('Date')['Sales'].sum()
+    assert sales_analytics.daily_sales(rollup).tolist() == expected.tolist()
+
+
+def test_daily_sales_for_region_skips_days_without_sales(sales_df):
+    rollup = sales_analytics.build_daily_rollup(sales_df)
+
+    north = sales_analytics.daily_sales(rollup, 'North')
+    assert list(north.index.strftime('%Y-%m-%d')) == ['2021-01-13', '2021-01-15']
+    assert north.tolist() == [150.0, 400.0]
+    assert sales_analytics.daily_sales(rollup, 'west').empty
+
+
+@pytest.fixture
+def long_series():
+    """Five years of daily sales with a single spike."""
+    index = pd.date_range('2018-01-01', periods=5 * 365, freq='D')
+    series = pd.Series(np.sin(np.arange(len(index)) / 30.0) * 100 + 1000, index=index)
+    series.iloc[400] = 5000
+    return series
+
+
+@pytest.mark.parametrize('method', ['lttb', 'minmax'])
+def test_downsample_bounds_points_and_keeps_extremes(long_series, method):
+    reduced = sales_analytics.downsample(long_series, 200, method)
+
+    assert len(reduced) <= 200
+    assert reduced.index.is_monotonic_increasing
+    assert reduced.index[0] == long_series.index[0]
+    assert reduced.index[-1] == long_series.index[-1]
+    assert reduced.max() == 5000
+
+
+def test_downsample_keeps_both_sides_of_split(long_series):
+    boundary = pd.Timestamp('2021-01-15')
+    reduced = sales_analytics.downsample(long_series, 100, split_at=boundary)
+
+    assert boundary in reduced.index
+    assert reduced.index[reduced.index < boundary][-1] == boundary - pd.Timedelta(days=1)
+
+
+def test_downsample_leaves_short_series_untouched(long_series):
+    assert sales_analytics.downsample(long_series, len(long_series)) is long_series
+    assert sales_analytics.downsample(long_series, None) is long_series
+    with pytest.raises(ValueError):
+        sales_analytics.downsample(long_series, 10, method='mean')
+
+
+def test_resolution_pyramid_averages_and_splits_periods(long_series):
+    rollup = pd.DataFrame({'north': long_series, 'south': long_series * 2})
+    boundary = pd.Timestamp('2021-01-15')
+    pyramid = sales_analytics.build_resolution_pyramid(rollup, split_at=boundary)
+
+    assert list(pyramid) == ['daily', 'weekly', 'monthly']
+    monthly = pyramid['monthly']
+    assert boundary in monthly.index
+    assert monthly.loc['2021-01-01', 'north'] == long_series.loc['2021-01-01':'2021-01-14'].mean()
+    assert monthly.loc[boundary, 'all'] == (long_series.loc['2021-01-15':'2021-01-31'] * 3).mean()
+
+
+def test_pyramid_series_picks_finest_level_that_fits(long_series):
+    pyramid = sales_analytics.build_resolution_pyramid(pd.DataFrame({'north': long_series}))
+
+    level, overview = sales_analytics.pyramid_series(pyramid, 'all', max_points=100)
+    assert level == 'monthly'
+    assert len(overview) == 60
+
+    level, detail = sales_analytics.pyramid_series(
+        pyramid, 'North', '2019-03-01', '2019-03-31', max_points=100
+    )
+    assert level == 'daily'
+    assert detail.equals(long_series.loc['2019-03-01':'2019-03-31'].rename('Sales'))
+
+
+def test_region_box_stats_match_tukey_box():
+    rng = np.random.default_rng(0)
+    sales = np.concatenate([rng.normal(1000, 50, 5000), [5000.0, 6000.0], rng.normal(2000, 80, 5000)])
+    df = pd.DataFrame({'Sales': sales, 'Region': ['north'] * 5002 + ['south'] * 5000})
+
+    stats = sales_analytics.region_box_stats(df, outlier_sample=10).set_index('Region')
+    north = df.loc[df['Region'] == 'north', 'Sales']
+    q1, q3 = north.quantile([0.25, 0.75])
+
+    assert list(stats.index) == ['north', 'south']
+    assert stats.loc['north', 'median'] == north.median()
+    assert stats.loc['north', 'upperfence'] == north[north <= q3 + 1.5 * (q3 - q1)].max()
+    assert stats.loc['north', 'count'] == 5002
+    assert 6000.0 in stats.loc['north', 'outliers']
+    assert all(len(outliers) <= 10 for outliers in stats['outliers'])
+
+
+def test_period_stats_table_covers_all_regions(sales_df):
+    rollup = sales_analytics.build_daily_rollup(sales_df)
+    table = sales_analytics.period_stats_table(rollup, pd.Timestamp('2021-01-15'))
+
+    assert sorted(table.index) == ['all', 'east', 'north', 'south']
+
+    overall = table.loc['all']
+    assert overall['before_total'] == 650.0
+    assert overall['before_days'] == 2
+    assert overall['before_avg'] == 325.0
+    assert overall['after_avg'] == 250.0
+    assert overall['percent_change'] == pytest.approx((250.0 - 325.0) / 325.0 * 100)
+
+    north = table.loc['north']
+    assert (north['before_avg'], north['after_avg']) == (150.0, 400.0)
+
+    # East only traded after the split, so it gets the zeroed stats
+    assert (table.loc['east'] == 0).all()
+
+
+def test_event_impact_table_handles_several_events_and_windows(sales_df, tmp_path):
+    registry = tmp_path / 'events.json'
+    registry.write_text(
+        '[{"id": "increase", "name": "Price Increase", "date": "2021-01-15"},'
+        ' {"id": "promo", "name": "Promotion", "date": "2021-01-14", "window_days": 1}]'
+    )
+    events = sales_analytics.load_events(registry)
+    rollup = sales_analytics.build_daily_rollup(sales_df)
+    table = sales_analytics.event_impact_table(rollup, events)
+
+    assert list(table.index.get_level_values('event').unique()) == ['increase', 'promo']
+    assert table.loc['increase'].equals(sales_analytics.period_stats_table(rollup, events['date'][0]))
+
+    # One day either side: 2021-01-13 before, 2021-01-14 after
+    promo = table.loc[('promo', 'all')]
+    assert (promo['before_total'], promo['after_total']) == (350.0, 300.0)
+    assert (promo['before_days'], promo['after_days']) == (1, 1)
+
+
+def test_load_events_rejects_duplicate_ids(tmp_path):
+    registry = tmp_path / 'events.json'
+    registry.write_text('[{"id": "a", "name": "A", "date": "2021-01-15"},'
+                        ' {"id": "a", "name": "B", "date": "2021-02-15"}]')
+    with pytest.raises(ValueError):
+        sales_analytics.load_events(registry)
+
+
+def test_date_indexed_sales_matches_period_stats_table(sales_df):
+    index = sales_analytics.DateIndexedSales(sales_df)
+    table = sales_analytics.period_stats_table(
+        sales_analytics.build_daily_rollup(sales_df), pd.Timestamp('2021-01-15')
+    )
+
+    assert index.regions == ['east', 'north', 'south']
+    for region in ['all', 'east', 'North', 'south']:
+        assert index.period_stats('2021-01-15', region) == pytest.approx(table.loc[region.lower()].to_dict())
+    assert index.period_stats('2021-01-15', 'west')['before_days'] == 0
+
+
+def test_date_indexed_sales_slices_half_open_windows(sales_df):
+    index = sales_analytics.DateIndexedSales(sales_df)
+
+    window = index.window('all', '2021-01-14', '2021-01-16')
+    assert window.tolist() == [300.0, 400.0, 25.0]
+    assert index.window('north', end='2021-01-14').tolist() == [100.0, 50.0]
+    assert index.daily('north').tolist() == [150.0, 400.0]
+    assert index.daily('all', start='2021-01-15').tolist() == [425.0, 75.0]
+
+
+def test_apply_new_sales_matches_batch_recompute(sales_df):
+    events = pd.DataFrame({
+        'id': ['increase', 'promo'],
+        'name': ['Price Increase', 'Promotion'],
+        'date': pd.to_datetime(['2021-01-15', '2021-01-14']),
+        'window_days': [np.nan, 1.0],
+    })
+    head, new = sales_df.iloc[:4], sales_df.iloc[4:]
+    new = pd.concat([new, pd.DataFrame({
+        'Sales': [10.0, 20.0],
+        'Date': pd.to_datetime(['2021-01-13', '2021-01-17']),
+        'Region': ['east', 'west'],
+    })], ignore_index=True)
+
+    rollup = sales_analytics.build_daily_rollup(head)
+    sums = sales_analytics.event_window_sums(sales_analytics.with_total(rollup), events)
+    rollup, sums = sales_analytics.apply_new_sales(rollup, sums, events, new)
+
+    combined = pd.concat([head, new], ignore_index=True)
+    expected_rollup = sales_analytics.build_daily_rollup(combined)
+    assert rollup.equals(expected_rollup)
+    assert sales_analytics.event_impact_from_sums(sums).equals(
+        sales_analytics.event_impact_table(expected_rollup, events)
+    )
+
+
+def test_update_resolution_pyramid_matches_rebuild():
+    dates = pd.date_range('2021-01-01', periods=120, freq='D')
+    history = pd.DataFrame({
+        'Sales': np.arange(240, dtype=float) % 13 + 1,
+        'Date': np.repeat(dates, 2),
+        'Region': np.tile(['north', 'south'], 120),
+    }).drop(index=[10, 11, 60])
+    # An existing day, a missing day, a day past the end and a new region
+    new = pd.DataFrame({
+        'Sales': [5.0, 7.0, 9.0, 11.0],
+        'Date': pd.to_datetime(['2021-02-14', '2021-01-06', '2021-06-01', '2021-03-10']),
+        'Region': ['north', 'south', 'north', 'west'],
+    })
+    split_at = list(pd.to_datetime(['2021-01-15', '2021-03-10']))
+
+    rollup = sales_analytics.build_daily_rollup(history)
+    pyramid = sales_analytics.build_resolution_pyramid(rollup, split_at)
+    events = pd.DataFrame({'id': ['split'], 'date': [split_at[0]], 'window_days': [np.nan]})
+    sums = sales_analytics.event_window_sums(sales_analytics.with_total(rollup), events)
+    rollup, _ = sales_analytics.apply_new_sales(rollup, sums, events, new)
+
+    updated = sales_analytics.update_resolution_pyramid(pyramid, rollup, new['Date'], split_at)
+    expected = sales_analytics.build_resolution_pyramid(rollup, split_at)
+    for level in ('daily', 'weekly', 'monthly'):
+        pd.testing.assert_frame_equal(updated[level], expected[level], check_freq=False)
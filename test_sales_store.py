@@ -0,0 +1,104 @@
+import os
+import sys
+import threading
+import time
+
+# Add current directory to path for imports
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from sales_store import DatasetWatcher, LazyDataset, WatchedDataset
+
+
+def test_lazy_dataset_loads_once_on_first_use():
+    calls = []
+
+    def factory():
+        calls.append(1)
+        time.sleep(0.05)
+        return {'rows': 42}
+
+    dataset = LazyDataset(factory)
+    assert not dataset.loaded
+    assert calls == []
+
+    results = []
+    threads = [threading.Thread(target=lambda: results.append(dataset.get())) for _ in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert len(calls) == 1
+    assert all(result is results[0] for result in results)
+    assert dataset.loaded
+
+
+def test_lazy_dataset_reset_rebuilds():
+    versions = iter([1, 2])
+    dataset = LazyDataset(lambda: next(versions))
+
+    assert dataset.get() == 1
+    assert dataset.get() == 1
+    dataset.reset()
+    assert dataset.get() == 2
+
+
+def test_watched_dataset_swaps_in_new_versions():
+    source = {'version': 1}
+    reloads = []
+    dataset = WatchedDataset(lambda: {'rows': source['version'] * 10}, lambda: source['version'])
+    dataset.on_reload(lambda: reloads.append(dataset.snapshot()[0]))
+
+    # Nothing is loaded until first use, so there is nothing to refresh
+    assert not dataset.refresh()
+    assert dataset.snapshot() == (1, {'rows': 10})
+    assert not dataset.refresh()
+
+    old = dataset.get()
+    source['version'] = 2
+    assert dataset.refresh()
+    assert dataset.snapshot() == (2, {'rows': 20})
+    assert old == {'rows': 10}
+    assert reloads == [2]
+
+
+def test_dataset_watcher_keeps_old_data_when_reload_fails():
+    source = {'version': 1, 'broken': False}
+
+    def factory():
+        if source['broken']:
+            raise ValueError("half-written file")
+        return source['version']
+
+    dataset = WatchedDataset(factory, lambda: source['version'])
+    watcher = DatasetWatcher(lambda: [dataset], interval=0.01)
+    dataset.get()
+
+    source.update(version=2, broken=True)
+    assert watcher.poll() == 0
+    assert dataset.snapshot() == (1, 1)
+
+    source['broken'] = False
+    watcher.start()
+    deadline = time.time() + 5
+    while dataset.get() != 2 and time.time() < deadline:
+        time.sleep(0.01)
+    watcher.stop()
+    assert dataset.snapshot() == (2, 2)
+    assert not watcher.running
+
+
+def test_watched_dataset_update_moves_to_the_new_version():
+    source = {'version': 1, 'rows': [1, 2]}
+    dataset = WatchedDataset(lambda: list(source['rows']), lambda: source['version'])
+    dataset.get()
+
+    def append(rows):
+        source['rows'].append(3)
+        source['version'] = 2
+        return rows + [3]
+
+    assert dataset.update(append) == [1, 2, 3]
+    assert dataset.snapshot() == (2, [1, 2, 3])
+    # Already at the source's version, so no reload is needed
+    assert not dataset.refresh()
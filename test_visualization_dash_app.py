@@ -0,0 +1,225 @@
+import os
+import sys
+
+import numpy as np
+import pandas as pd
+import pytest
+
+# Add current directory to path for imports
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+import visualization_dash_app as dashboard
+from Data_filtering import product_file, write_partitioned
+
+
+def sales_frame(start='2019-01-01', days=1000, regions=('north', 'south')):
+    """Daily consolidated-layout sales for each region."""
+    dates = pd.date_range(start, periods=days, freq='D')
+    return pd.DataFrame({
+        'Sales': np.arange(days * len(regions), dtype=float) % 97 + 100,
+        'Date': np.repeat(dates, len(regions)),
+        'Region': np.tile(regions, days),
+    })
+
+
+@pytest.fixture
+def app(tmp_path, monkeypatch):
+    """The dashboard serving a fresh Pink Morsel file from tmp_path, with empty caches."""
+    monkeypatch.chdir(tmp_path)
+    monkeypatch.setattr(dashboard, 'RELOAD_INTERVAL', 0)
+    sales_frame().to_csv(dashboard.CONSOLIDATED_FILE, index=False)
+
+    sales_data = dashboard.watched_product_data(dashboard.DEFAULT_PRODUCT)
+    monkeypatch.setattr(dashboard, 'sales_data', sales_data)
+    monkeypatch.setattr(dashboard, 'product_datasets', {dashboard.DEFAULT_PRODUCT: sales_data})
+    monkeypatch.setattr(dashboard, 'product_list', dashboard.WatchedDataset(
+        dashboard.list_available_products, dashboard.products_version))
+    dashboard.dashboard_cache.clear()
+    yield dashboard
+    dashboard.dashboard_cache.clear()
+
+
+def run_callback(app, output, inputs, changed):
+    """POST a callback request the way the browser does; returns the response payload."""
+    outputs = [{'id': part.split('.')[0], 'property': part.split('.')[1]}
+               for part in output.strip('.').split('...')]
+    body = {
+        'output': output,
+        'outputs': outputs if output.startswith('..') else outputs[0],
+        'inputs': [{'id': id_, 'property': prop, 'value': value}
+                   for (id_, prop), value in inputs.items()],
+        'changedPropIds': [changed],
+    }
+    response = app.server.test_client().post('/_dash-update-component', json=body)
+    assert response.status_code == 200, response.data
+    return response.get_json()['response']
+
+
+def chart_inputs(relayout_data, product='pink morsel', region='all', event=None):
+    return {
+        ('region-filter', 'value'): region,
+        ('event-filter', 'value'): event,
+        ('product-filter', 'value'): product,
+        ('sales-chart', 'relayoutData'): relayout_data,
+        ('data-version', 'data'): None,
+    }
+
+
+@pytest.mark.parametrize('changed', ['event-filter.value', 'product-filter.value'])
+def test_chart_keeps_detail_in_zoom_when_event_or_product_changes(app, changed):
+    zoom = {'xaxis.range[0]': '2020-03-01', 'xaxis.range[1]': '2020-03-31'}
+    figure = run_callback(app, 'sales-chart.figure', chart_inputs(zoom), changed)['sales-chart']['figure']
+
+    # Every day in view
+    assert len(figure['data'][0]['x']) == 31
+    assert figure['layout']['xaxis']['range'] == ['2020-03-01', '2020-03-31']
+
+
+def test_chart_region_change_shows_overview(app):
+    zoom = {'xaxis.range[0]': '2020-03-01', 'xaxis.range[1]': '2020-03-31'}
+    figure = run_callback(app, 'sales-chart.figure', chart_inputs(zoom, region='north'),
+                          'region-filter.value')['sales-chart']['figure']
+
+    assert 31 < len(figure['data'][0]['x']) <= app.CHART_DETAIL_POINTS
+    assert figure['layout']['uirevision'] == 'north'
+
+
+@pytest.mark.parametrize('downsampling', ['lttb', 'minmax', 'average'])
+def test_chart_overview_stays_within_the_point_budget(app, downsampling):
+    data = app.sales_data.get()
+    history = data['pyramid']['daily']['all']
+    figure = app.create_sales_chart(data['pyramid'], detail_points=100, downsampling=downsampling)
+    shown = pd.Series(figure.data[0].y, index=pd.DatetimeIndex(figure.data[0].x))
+
+    assert len(shown) <= 100
+    if downsampling == 'average':
+        assert 'monthly average' in figure.layout.title.text
+    else:
+        # Real daily values, including the extremes and both ends
+        assert shown.isin(history).all()
+        assert shown.index[0] == history.index[0] and shown.index[-1] == history.index[-1]
+        assert shown.max() == history.max()
+
+
+def ingest(app, rows, monkeypatch):
+    monkeypatch.setattr(app, 'INGEST_ENABLED', True)
+    return app.server.test_client().post('/_ingest', json=rows)
+
+
+def raw_row(date, product='pink morsel', quantity=10, region='north'):
+    return {'product': product, 'price': '$3.00', 'quantity': quantity, 'date': date, 'region': region}
+
+
+def test_ingest_folds_rows_into_the_loaded_data_and_file(app, monkeypatch):
+    before = app.sales_data.get()
+    response = ingest(app, [raw_row('2021-09-28'), raw_row('2021-09-28', 'gold morsel'),
+                            raw_row('2019-01-05', region='south')], monkeypatch)
+
+    assert response.status_code == 200
+    assert response.get_json() == {'ingested': {'pink morsel': 2}, 'skipped': {'gold morsel': 1}}
+    written = pd.read_csv(app.CONSOLIDATED_FILE, parse_dates=['Date'])
+    assert len(written) == len(before['df']) + 2
+
+    data = app.sales_data.get()
+    expected = app.build_resolution_pyramid(app.build_daily_rollup(written),
+                                            split_at=list(data['events']['date']))
+    for level in ('daily', 'weekly', 'monthly'):
+        pd.testing.assert_frame_equal(data['pyramid'][level], expected[level], check_freq=False)
+
+
+def test_ingest_rejects_bad_dates_without_writing(app, monkeypatch):
+    original = open(app.CONSOLIDATED_FILE, 'rb').read()
+    response = ingest(app, [raw_row('2021-09-28'), raw_row('28/09/2021')], monkeypatch)
+
+    assert response.status_code == 400
+    assert open(app.CONSOLIDATED_FILE, 'rb').read() == original
+
+
+def test_ingest_writes_nothing_when_the_fold_fails(app, monkeypatch):
+    original = open(app.CONSOLIDATED_FILE, 'rb').read()
+
+    def failing_fold(*args):
+        raise RuntimeError("fold failed")
+
+    monkeypatch.setattr(app, 'apply_new_sales', failing_fold)
+    response = ingest(app, [raw_row('2021-09-28')], monkeypatch)
+
+    assert response.status_code == 500
+    assert open(app.CONSOLIDATED_FILE, 'rb').read() == original
+
+
+def test_ingest_refuses_products_served_from_the_partitioned_dataset(app, monkeypatch):
+    original = open(app.CONSOLIDATED_FILE, 'rb').read()
+    combined = pd.read_csv(app.CONSOLIDATED_FILE, parse_dates=['Date']).assign(Product='pink morsel')
+    write_partitioned(combined, app.DATASET_DIR)
+
+    response = ingest(app, [raw_row('2021-09-28')], monkeypatch)
+
+    assert response.status_code == 409
+    assert open(app.CONSOLIDATED_FILE, 'rb').read() == original
+
+
+def dashboard_inputs(product, region='all', event=None):
+    return {
+        ('region-filter', 'value'): region,
+        ('event-filter', 'value'): event,
+        ('product-filter', 'value'): product,
+        ('data-version', 'data'): None,
+    }
+
+
+DASHBOARD_OUTPUT = ('..page-title.children...page-subtitle.children...before-label.children...'
+                    'after-label.children...before-metric.children...after-metric.children...'
+                    'change-metric.children...conclusion-content.children..')
+
+
+def test_product_selector_serves_each_products_file(app):
+    os.makedirs(app.PRODUCT_DIR)
+    sales_frame().assign(Sales=1.0).to_csv(product_file('gold morsel', app.PRODUCT_DIR), index=False)
+    assert app.available_products() == ['pink morsel', 'gold morsel']
+
+    gold = run_callback(app, DASHBOARD_OUTPUT, dashboard_inputs('gold morsel'), 'product-filter.value')
+    assert gold['page-title']['children'] == '🍓 Gold Morsel Sales Analytics'
+    assert gold['before-metric']['children'] == '$2'
+
+    # Products without data fall back to Pink Morsel
+    unknown = run_callback(app, DASHBOARD_OUTPUT, dashboard_inputs('lapis morsel'), 'product-filter.value')
+    assert unknown['page-title']['children'] == '🍓 Pink Morsel Sales Analytics'
+
+
+def test_product_list_is_only_relisted_when_its_sources_change(app, monkeypatch):
+    listings = []
+    list_products = app.list_products
+    monkeypatch.setattr(app, 'list_products', lambda *args: listings.append(args) or list_products(*args))
+
+    assert app.available_products() == ['pink morsel']
+    assert app.available_products() == ['pink morsel']
+    assert len(listings) == 1
+
+    os.makedirs(app.PRODUCT_DIR)
+    sales_frame().to_csv(product_file('gold morsel', app.PRODUCT_DIR), index=False)
+    assert app.available_products() == ['pink morsel', 'gold morsel']
+    assert len(listings) == 2
+
+
+def test_dashboard_reads_the_newer_of_partitioned_dataset_and_file(app):
+    csv_version = app.data_version()
+    assert not app.reads_partitioned_dataset()
+    assert (app.sales_data.get()['df']['Sales'] != 5.0).all()
+
+    partitioned = sales_frame().assign(Sales=5.0, Product='pink morsel')
+    write_partitioned(partitioned, app.DATASET_DIR)
+    assert app.reads_partitioned_dataset()
+    assert app.sales_data.refresh()
+    assert (app.sales_data.get()['df']['Sales'] == 5.0).all()
+    dataset_version = app.data_version()
+    assert dataset_version != csv_version
+
+    # A later plain ETL run rewrites the consolidated file, which wins again
+    sales_frame().assign(Sales=7.0).to_csv(app.CONSOLIDATED_FILE, index=False)
+    later = os.stat(os.path.join(app.DATASET_DIR, '_manifest.json')).st_mtime + 10
+    os.utime(app.CONSOLIDATED_FILE, (later, later))
+    assert not app.reads_partitioned_dataset()
+    assert app.sales_data.refresh()
+    assert (app.sales_data.get()['df']['Sales'] == 7.0).all()
+    assert app.data_version() not in (csv_version, dataset_version)
@@ -1,13 +1,31 @@
 import dash
-from dash import dcc, html, Input, Output, callback
-import plotly.express as px
+from dash import dcc, html, Input, Output, State, callback, ctx
+from dash.exceptions import PreventUpdate
+from flask import has_request_context, jsonify, request
 import plotly.graph_objects as go
 import pandas as pd
+import numpy as np
+import os
 import datetime as dt
+from functools import partial
 from datetime import datetime
 
+from Data_filtering import (CONSOLIDATED_FILE, PRODUCT_SALES_DIR, SALES_DATASET_DIR,
+                            build_sales_data, consolidated_version, dataset_version,
+                            extract_sales, is_fresh, list_partitioned_products, list_products,
+                            load_consolidated, product_file, read_consolidated,
+                            read_partitioned)
+from dashboard_cache import make_cache
+from sales_store import DatasetWatcher, LazyDataset, WatchedDataset
+from sales_analytics import (apply_new_sales, build_daily_rollup, build_resolution_pyramid,
+                             downsample, event_impact_from_sums, event_window_sums, load_events,
+                             pyramid_series, region_box_stats, update_resolution_pyramid,
+                             with_total)
+
 # Initialize the Dash app
 app = dash.Dash(__name__)
+# Flask server for WSGI hosts, e.g. `gunicorn visualization_dash_app:server`
+server = app.server
 
 # Custom CSS styling
 app.index_string = '''
@@ -270,14 +288,30 @@ app.index_string = '''
 '''
 
 
-def load_and_process_data(csv_file='pink_morsel_sales_consolidated.csv'):
-    df = pd.read_csv(csv_file)
+# Per-product files written by `python Data_filtering.py --all-products`
+PRODUCT_DIR = os.environ.get('SALES_PRODUCT_DIR', PRODUCT_SALES_DIR)
+DEFAULT_PRODUCT = 'pink morsel'
+
+# Partitioned dataset written by `python Data_filtering.py --partitioned`. A product
+# is read from it while its manifest is at least as new as the product's
+# consolidated file (or that file is missing); a later plain ETL run rewrites the
+# file, so the dashboard falls back to it and its Parquet/Arrow copies.
+DATASET_DIR = os.environ.get('SALES_DATASET_DIR', SALES_DATASET_DIR)
+# Only load this many of the most recent days from the dataset, e.g. 90 (all history if unset)
+HISTORY_DAYS = int(os.environ['SALES_HISTORY_DAYS']) if os.environ.get('SALES_HISTORY_DAYS') else None
 
-    # Ensure Date column is datetime
-    df['Date'] = pd.to_datetime(df['Date'])
 
-    # Sort by date
-    df = df.sort_values('Date').reset_index(drop=True)
+def load_and_process_data(csv_file=CONSOLIDATED_FILE):
+    # Prefer the memory-mapped Arrow store or typed Parquet copy when fresh. The
+    # Pink Morsel file is built in-process from the raw data on a cold start.
+    if csv_file == CONSOLIDATED_FILE:
+        df = load_consolidated(csv_file)
+    else:
+        df = read_consolidated(csv_file)
+
+    # Sort by date, unless already sorted (keeps a memory-mapped store zero-copy)
+    if not df['Date'].is_monotonic_increasing:
+        df = df.sort_values('Date', kind='stable').reset_index(drop=True)
 
     return df
 
@@ -286,67 +320,283 @@ def create_processed_data():
     """
     Create processed data from raw CSV files if consolidated file doesn't exist.
     """
-    input_files = [
-        'data/daily_sales_data_0.csv',
-        'data/daily_sales_data_1.csv',
-        'data/daily_sales_data_2.csv'
-    ]
+    return build_sales_data()
 
-    all_data = []
-    for file_path in input_files:
-        try:
-            df = pd.read_csv(file_path)
-            all_data.append(df)
-        except FileNotFoundError:
-            print(f"Warning: {file_path} not found")
 
+# Callback outputs per region (and chart zoom range) and dataset version. Set
+# DASHBOARD_CACHE_PATH to a SQLite file to share them between worker processes.
+dashboard_cache = make_cache(
+    os.environ.get('DASHBOARD_CACHE_PATH'),
+    maxsize=int(os.environ.get('DASHBOARD_CACHE_SIZE', 64)),
+    ttl=float(os.environ['DASHBOARD_CACHE_TTL']) if os.environ.get('DASHBOARD_CACHE_TTL') else None
+)
 
-    # Combine and process
-    combined_df = pd.concat(all_data, ignore_index=True)
-    pink_morsel_df = combined_df[
-        combined_df['product'].str.lower() == 'pink morsel'
-        ].copy()
+# Define the price increase date
+PRICE_INCREASE_DATE = datetime(2021, 1, 15)
 
-    # Parse price and calculate sales
-    pink_morsel_df['price_numeric'] = pink_morsel_df['price'].str.replace('$', '').astype(float)
-    pink_morsel_df['Sales'] = pink_morsel_df['price_numeric'] * pink_morsel_df['quantity']
+# Registry of price changes and promotions to analyse; the first one is shown by default
+EVENTS_FILE = os.environ.get('SALES_EVENTS_FILE', 'events.json')
 
-    # Create output format
-    output_df = pink_morsel_df[['Sales', 'date', 'region']].copy()
-    output_df.rename(columns={'date': 'Date', 'region': 'Region'}, inplace=True)
+# The sales line shows at most this many points in view
+CHART_DETAIL_POINTS = int(os.environ.get('SALES_CHART_DETAIL_POINTS', 400))
 
-    return output_df
+# How a view with more days than that is thinned: 'lttb' or 'minmax' pick real daily
+# points that keep the line's shape; 'average' shows weekly or monthly averages instead
+CHART_DOWNSAMPLING = os.environ.get('SALES_CHART_DOWNSAMPLING', 'lttb')
 
 
+def load_dashboard_events(events_file=EVENTS_FILE):
+    """Load the event registry, or just the price increase if there is no registry file."""
+    if not os.path.exists(events_file):
+        return pd.DataFrame({
+            'id': ['price-increase'],
+            'name': ['Price Increase'],
+            'date': [pd.Timestamp(PRICE_INCREASE_DATE)],
+            'window_days': [np.nan]
+        })
+    return load_events(events_file)
 
-# Load the data
-df = load_and_process_data()
 
-# Define the price increase date
-PRICE_INCREASE_DATE = datetime(2021, 1, 15)
+def load_dashboard_data(csv_file=CONSOLIDATED_FILE, product=None):
+    """
+    Load a product's sales and build the views the callbacks read from. When
+    reads_partitioned_dataset(product), only that product's partitions (within
+    the last HISTORY_DAYS days, if set) are read; otherwise csv_file is.
+    """
+    if product is not None and reads_partitioned_dataset(product):
+        df = read_partitioned(DATASET_DIR, products=[product], last_days=HISTORY_DAYS)
+    else:
+        df = load_and_process_data(csv_file)
+    events = load_dashboard_events()
+
+    # Date x Region daily totals; every callback is answered from this
+    rollup = build_daily_rollup(df)
+    event_sums = event_window_sums(with_total(rollup), events)
+
+    return {
+        'df': df,
+        'rollup': rollup,
+        'events': events,
+        # Raw before/after sums, kept so live sales can be added to them
+        'event_sums': event_sums,
+        # Before/after stats for every (event, region); callbacks and the page layout read this
+        'event_stats': event_impact_from_sums(event_sums),
+        # Daily/weekly/monthly views for zoom-driven detail; periods never straddle an event
+        'pyramid': build_resolution_pyramid(rollup, split_at=list(events['date'])),
+        # Per-region quartiles/whiskers so the box plot does not ship every row
+        'box_stats': region_box_stats(df),
+    }
+
+
+def products_version():
+    """Changes whenever a file is added to or removed from PRODUCT_DIR, or the manifest is rewritten."""
+    try:
+        product_dir_mtime = os.stat(PRODUCT_DIR).st_mtime_ns
+    except FileNotFoundError:
+        product_dir_mtime = None
+    return (product_dir_mtime, dataset_version(DATASET_DIR))
+
+
+def list_available_products():
+    """Pink Morsel first, then every product in PRODUCT_DIR or the partitioned dataset."""
+    products = set(list_products(PRODUCT_DIR)) | set(list_partitioned_products(DATASET_DIR))
+    return [DEFAULT_PRODUCT] + sorted(products - {DEFAULT_PRODUCT})
+
+
+# Every callback asks for the product list; it is only re-listed when its sources change
+product_list = WatchedDataset(list_available_products, products_version)
+
+
+def available_products():
+    """list_available_products, re-listed only when products_version() changes."""
+    product_list.refresh()
+    return list(product_list.get())
+
+
+def product_data_file(product=None):
+    """Consolidated file read for a product; Pink Morsel keeps its own file."""
+    if product in (None, DEFAULT_PRODUCT):
+        return CONSOLIDATED_FILE
+    return str(product_file(product, PRODUCT_DIR))
+
+
+def reads_partitioned_dataset(product=DEFAULT_PRODUCT):
+    """True if the product is served from the partitioned dataset rather than its consolidated file."""
+    return is_fresh(os.path.join(DATASET_DIR, '_manifest.json'), product_data_file(product))
+
+
+def data_version(product=DEFAULT_PRODUCT):
+    """
+    Changes whenever either source of a product's data is rewritten, including
+    when the newer of the two (and so the one read) changes; part of every
+    cache key.
+    """
+    return (dataset_version(DATASET_DIR), consolidated_version(product_data_file(product)))
+
+
+def resolve_product(product=None):
+    """The selected product if it has data, Pink Morsel otherwise."""
+    return product if product in available_products() else DEFAULT_PRODUCT
+
+
+def watched_product_data(product):
+    """A product's dashboard data, loaded on first use and reloaded when its data_version changes."""
+    dataset = WatchedDataset(partial(load_dashboard_data, product_data_file(product), product),
+                             partial(data_version, product))
+    # Entries keyed on the old version can never be hit again; drop them with the swap
+    dataset.on_reload(dashboard_cache.clear)
+    return dataset
+
+
+# Loaded on first use rather than at import, so importing the module stays cheap
+sales_data = watched_product_data(DEFAULT_PRODUCT)
+
+# One dataset per product, each loaded from its own file the first time it is selected
+product_datasets = {DEFAULT_PRODUCT: sales_data}
+
+
+def product_dataset(product=DEFAULT_PRODUCT):
+    """The lazily loaded dataset for an available product."""
+    if product not in product_datasets:
+        product_datasets.setdefault(product, watched_product_data(product))
+    return product_datasets[product]
+
+
+# Reload new versions of the data in the background, every SALES_RELOAD_INTERVAL
+# seconds (0 disables), so workers pick them up without a restart
+RELOAD_INTERVAL = float(os.environ.get('SALES_RELOAD_INTERVAL', 5))
+dataset_watcher = DatasetWatcher(lambda: list(product_datasets.values()), RELOAD_INTERVAL)
+
 
+# Poll for new data from the browser every SALES_LIVE_REFRESH_MS milliseconds (0 disables);
+# the charts are only re-rendered when the data version actually changed
+LIVE_REFRESH_MS = int(os.environ.get('SALES_LIVE_REFRESH_MS', 5000))
 
-def create_sales_chart(df, selected_region='all'):
-    """Create the main sales line chart with optional region filtering."""
+# Accept new sales rows POSTed to /_ingest from this machine when SALES_INGEST=1
+INGEST_ENABLED = os.environ.get('SALES_INGEST') == '1'
+
+
+def fold_in_sales(csv_file, rows, data):
+    """
+    Fold new consolidated-layout rows (with parsed dates) into a product's
+    loaded data and append them to csv_file: the rollup and event sums are
+    updated incrementally, and only the pyramid periods containing the new
+    days are re-aggregated. The rows
+    are only written once the fold has succeeded, so a failed update never
+    leaves them in the file. The box plot and the transaction frame catch up
+    at the next full reload.
+    """
+    rollup, event_sums = apply_new_sales(data['rollup'], data['event_sums'], data['events'], rows)
+    rows.to_csv(csv_file, mode='a', header=not os.path.exists(csv_file), index=False)
+    return {
+        **data,
+        'rollup': rollup,
+        'event_sums': event_sums,
+        'event_stats': event_impact_from_sums(event_sums),
+        'pyramid': update_resolution_pyramid(data['pyramid'], rollup, rows['Date'],
+                                             split_at=list(data['events']['date'])),
+    }
+
+
+@server.route('/_ingest', methods=['POST'])
+def ingest_sales():
+    # Raw sales rows as in the daily files: product, price, quantity, date, region
+    if not INGEST_ENABLED or request.remote_addr not in ('127.0.0.1', '::1'):
+        return jsonify(error="ingestion is disabled"), 403
+    try:
+        sales = extract_sales(pd.DataFrame(request.get_json(force=True)))
+        # Reject bad dates here, before anything is written to the consolidated file
+        sales['Date'] = pd.to_datetime(sales['Date'], format='%Y-%m-%d')
+    except (KeyError, TypeError, ValueError) as e:
+        return jsonify(error=f"invalid sales rows: {e}"), 400
+
+    ingested = {}
+    products = available_products()
+    groups = list(sales.groupby('Product', sort=True))
+    # Products without data on the dashboard are reported back rather than stored
+    skipped = {product: len(rows) for product, rows in groups if product not in products}
+    groups = [(product, rows) for product, rows in groups if product in products]
+    # Rows are only appended to consolidated files; a product served from the
+    # partitioned dataset would never see them, so refuse rather than drop them
+    partitioned = [product for product, _ in groups if reads_partitioned_dataset(product)]
+    if partitioned:
+        return jsonify(error=f"cannot ingest while the partitioned dataset is served for {partitioned}; "
+                             "re-run the ETL without --partitioned to ingest live rows"), 409
+    for product, rows in groups:
+        rows = rows.drop(columns='Product')
+        product_dataset(product).update(partial(fold_in_sales, product_data_file(product), rows))
+        ingested[product] = len(rows)
+    return jsonify(ingested=ingested, skipped=skipped)
+
+
+@server.before_request
+def start_dataset_watcher():
+    # Started from the first request rather than at import, so it runs in each
+    # worker process (threads do not survive a pre-fork server's fork)
+    if RELOAD_INTERVAL > 0 and not dataset_watcher.running:
+        dataset_watcher.start()
+
+
+def get_event(events, event_id=None):
+    """The registered event with the given id as a dict, defaulting to the first one."""
+    matches = events[events['id'] == event_id]
+    return (matches if len(matches) else events).iloc[0].to_dict()
+
+
+def describe_event(event):
+    """E.g. 'price increase on January 15th, 2021'."""
+    day = event['date'].day
+    suffix = 'th' if 11 <= day <= 13 else {1: 'st', 2: 'nd', 3: 'rd'}.get(day % 10, 'th')
+    return f"{event['name'].lower()} on {event['date']:%B} {day}{suffix}, {event['date'].year}"
+
+
+def page_headings(event, product=DEFAULT_PRODUCT):
+    """The page title, subtitle and before/after card labels for an event and product."""
+    return (
+        f"🍓 {product.title()} Sales Analytics",
+        f"Impact Analysis of the {describe_event(event)}",
+        f"📊 Before {event['name']}",
+        f"📈 After {event['name']}",
+    )
+
+
+def create_sales_chart(pyramid, selected_region='all', date_range=None, event=None,
+                       product=DEFAULT_PRODUCT, detail_points=CHART_DETAIL_POINTS,
+                       downsampling=CHART_DOWNSAMPLING):
+    """
+    Create the main sales line chart with optional region filtering, marking
+    the selected event (the price increase by default). Without a date_range
+    the whole history is shown; a (start, end) range shows only those days.
+    Either way at most detail_points points are sent: daily sales thinned by
+    `downsampling` ('lttb' or 'minmax'), or with 'average' the finest of the
+    daily/weekly/monthly averages that fits.
+    """
+    event = event or {'name': 'Price Increase', 'date': pd.Timestamp(PRICE_INCREASE_DATE)}
 
-    # Filter data by region if not 'all'
     if selected_region != 'all':
-        filtered_df = df[df['Region'].str.lower() == selected_region.lower()].copy()
-        chart_title = f'Pink Morsel Daily Sales - {selected_region.title()} Region'
+        chart_title = f'{product.title()} Daily Sales - {selected_region.title()} Region'
     else:
-        filtered_df = df.copy()
-        chart_title = 'Pink Morsel Daily Sales - All Regions'
-
-    # Aggregate daily sales
-    daily_sales = filtered_df.groupby('Date')['Sales'].sum().reset_index()
+        chart_title = f'{product.title()} Daily Sales - All Regions'
+
+    start, end = date_range or (None, None)
+    if downsampling == 'average':
+        # Sales in view for the selected region, at the finest resolution that fits
+        level, region_sales = pyramid_series(pyramid, selected_region, start, end, detail_points)
+        if level != 'daily':
+            chart_title += f' ({level} average)'
+    else:
+        # Daily sales in view, thinned to the budget without blurring the event
+        _, region_sales = pyramid_series(pyramid, selected_region, start, end, max_points=None)
+        region_sales = downsample(region_sales, detail_points, downsampling, split_at=event['date'])
+    full_range = pyramid['daily'].index
 
     # Create the line chart
     fig = go.Figure()
 
     # Add the main sales line with gradient effect
     fig.add_trace(go.Scatter(
-        x=daily_sales['Date'],
-        y=daily_sales['Sales'],
+        x=region_sales.index,
+        y=region_sales.values,
         mode='lines',
         name='Daily Sales',
         line=dict(color='#4facfe', width=3),
@@ -355,10 +605,10 @@ def create_sales_chart(df, selected_region='all'):
         hovertemplate='<b>Date:</b> %{x}<br><b>Sales:</b> $%{y:,.0f}<extra></extra>'
     ))
 
-    # Convert price increase date to same format as data
-    price_increase_str = PRICE_INCREASE_DATE.strftime('%Y-%m-%d')
+    # Convert event date to same format as data
+    price_increase_str = event['date'].strftime('%Y-%m-%d')
 
-    # Add vertical line for price increase
+    # Add vertical line for the event
     fig.add_shape(
         type="line",
         x0=price_increase_str,
@@ -374,7 +624,7 @@ def create_sales_chart(df, selected_region='all'):
         x=price_increase_str,
         y=0.95,
         yref="paper",
-        text="💰 Price Increase<br>Jan 15, 2021",
+        text=f"💰 {event['name']}<br>{event['date']:%b %d, %Y}",
         showarrow=True,
         arrowhead=2,
         arrowsize=1,
@@ -389,7 +639,7 @@ def create_sales_chart(df, selected_region='all'):
     # Add shaded regions
     fig.add_shape(
         type="rect",
-        x0=daily_sales['Date'].min(),
+        x0=full_range.min(),
         y0=0,
         x1=price_increase_str,
         y1=1,
@@ -404,7 +654,7 @@ def create_sales_chart(df, selected_region='all'):
         type="rect",
         x0=price_increase_str,
         y0=0,
-        x1=daily_sales['Date'].max(),
+        x1=full_range.max(),
         y1=1,
         yref="paper",
         fillcolor="rgba(46, 204, 113, 0.1)",
@@ -430,175 +680,344 @@ def create_sales_chart(df, selected_region='all'):
         showlegend=False,
         plot_bgcolor='rgba(0,0,0,0)',
         paper_bgcolor='rgba(0,0,0,0)',
-        font=dict(family='Inter', size=12, color='#2c3e50')
+        font=dict(family='Inter', size=12, color='#2c3e50'),
+        # Keep the user's zoom while finer data is swapped in; reset on region change
+        uirevision=selected_region
     )
+    if date_range:
+        fig.update_xaxes(range=list(date_range))
 
     return fig
 
 
-def calculate_period_stats(df, selected_region='all'):
-    """Calculate statistics before and after the price increase."""
+EMPTY_STATS = {
+    'before_avg': 0,
+    'after_avg': 0,
+    'before_total': 0,
+    'after_total': 0,
+    'before_days': 0,
+    'after_days': 0,
+    'percent_change': 0
+}
 
-    # Filter by region if not 'all'
-    if selected_region != 'all':
-        df = df[df['Region'].str.lower() == selected_region.lower()].copy()
-
-    df_copy = df.copy()
-    df_copy['Date'] = pd.to_datetime(df_copy['Date'])
-
-    before_increase = df_copy[df_copy['Date'] < PRICE_INCREASE_DATE]
-    after_increase = df_copy[df_copy['Date'] >= PRICE_INCREASE_DATE]
-
-    # Calculate daily averages
-    before_daily = before_increase.groupby('Date')['Sales'].sum()
-    after_daily = after_increase.groupby('Date')['Sales'].sum()
-
-    if len(before_daily) == 0 or len(after_daily) == 0:
-        return {
-            'before_avg': 0,
-            'after_avg': 0,
-            'before_total': 0,
-            'after_total': 0,
-            'before_days': 0,
-            'after_days': 0,
-            'percent_change': 0
-        }
-
-    stats = {
-        'before_avg': before_daily.mean(),
-        'after_avg': after_daily.mean(),
-        'before_total': before_increase['Sales'].sum(),
-        'after_total': after_increase['Sales'].sum(),
-        'before_days': len(before_daily),
-        'after_days': len(after_daily),
-        'percent_change': ((after_daily.mean() - before_daily.mean()) / before_daily.mean()) * 100
-    }
 
+def calculate_period_stats(event_stats, selected_region='all', event_id=None):
+    """
+    Statistics before and after an event (the first registered one by default),
+    read from the precomputed event table.
+    """
+    if event_id is None:
+        event_id = event_stats.index.get_level_values('event')[0]
+
+    key = (event_id, selected_region.lower())
+    if key not in event_stats.index:
+        return dict(EMPTY_STATS)
+
+    stats = event_stats.loc[key].to_dict()
+    stats['before_days'] = int(stats['before_days'])
+    stats['after_days'] = int(stats['after_days'])
     return stats
 
 
-# Calculate initial statistics
-stats = calculate_period_stats(df)
+def create_regional_chart(box_stats):
+    """Create the sales distribution box plot by region from precomputed box stats."""
+    colors = ['#4facfe', '#00f2fe', '#667eea', '#764ba2']
+    fig = go.Figure()
+
+    for i, row in enumerate(box_stats.itertuples()):
+        color = colors[i % len(colors)]
+        fig.add_trace(go.Box(
+            x=[row.Region],
+            q1=[row.q1],
+            median=[row.median],
+            q3=[row.q3],
+            lowerfence=[row.lowerfence],
+            upperfence=[row.upperfence],
+            name=row.Region,
+            marker_color=color
+        ))
+
+        # Only a bounded sample of outliers is sent to the browser
+        if row.outliers:
+            fig.add_trace(go.Scatter(
+                x=[row.Region] * len(row.outliers),
+                y=row.outliers,
+                mode='markers',
+                marker=dict(color=color, size=5),
+                name=row.Region,
+                hovertemplate='<b>Sales:</b> $%{y:,.0f}<extra></extra>'
+            ))
+
+    return fig.update_layout(
+        template='plotly_white',
+        xaxis_title='Region',
+        yaxis_title='Sales',
+        height=400,
+        plot_bgcolor='rgba(0,0,0,0)',
+        paper_bgcolor='rgba(0,0,0,0)',
+        font=dict(family='Inter', size=12, color='#2c3e50'),
+        showlegend=False
+    )
 
-# Define the app layout
-app.layout = html.Div([
-    html.Div([
-        # Header
-        html.Div([
-            html.H1("🍓 Pink Morsel Sales Analytics", className="pulse"),
-            html.H3("Impact Analysis: Price Increase Strategy • January 15th, 2021")
-        ], className="header-section"),
 
-        # Key Metrics Cards
+def build_layout(stats, regional_figure, events=None, products=(DEFAULT_PRODUCT,), version=None):
+    """
+    Build the page from the default event's stats, the regional figure, the
+    event registry, the products on offer and the version of the data shown.
+    """
+    event_options = [] if events is None else [
+        {'label': f"{event.name} ({event.date:%b %d, %Y})", 'value': event.id}
+        for event in events.itertuples()
+    ]
+    event = ({'name': 'Price Increase', 'date': pd.Timestamp(PRICE_INCREASE_DATE)}
+             if events is None else get_event(events))
+    event_text = describe_event(event)
+    title, subtitle, before_label, after_label = page_headings(event)
+
+    return html.Div([
         html.Div([
+            # Header
             html.Div([
-                html.H4("📊 Before Price Increase", style={'color': '#3498db'}),
-                html.H2(id="before-metric", children=f"${stats['before_avg']:,.0f}"),
-                html.P("Average Daily Sales")
-            ], className="metric-card", style={'border-left-color': '#3498db'}),
+                html.H1(id="page-title", children=title, className="pulse"),
+                html.H3(id="page-subtitle", children=subtitle)
+            ], className="header-section"),
 
+            # Key Metrics Cards
+            html.Div([
+                html.Div([
+                    html.H4(id="before-label", children=before_label, style={'color': '#3498db'}),
+                    html.H2(id="before-metric", children=f"${stats['before_avg']:,.0f}"),
+                    html.P("Average Daily Sales")
+                ], className="metric-card", style={'border-left-color': '#3498db'}),
+
+                html.Div([
+                    html.H4(id="after-label", children=after_label, style={'color': '#27ae60'}),
+                    html.H2(id="after-metric", children=f"${stats['after_avg']:,.0f}"),
+                    html.P("Average Daily Sales")
+                ], className="metric-card", style={'border-left-color': '#27ae60'}),
+
+                html.Div([
+                    html.H4("📊 Performance Change",
+                            style={'color': '#e74c3c' if stats['percent_change'] < 0 else '#27ae60'}),
+                    html.H2(id="change-metric", children=f"{stats['percent_change']:+.1f}%"),
+                    html.P("Percentage Impact")
+                ], className="metric-card",
+                    style={'border-left-color': '#e74c3c' if stats['percent_change'] < 0 else '#27ae60'})
+            ], className="metrics-container"),
+
+            # Product, Region and Event Controls
             html.Div([
-                html.H4("📈 After Price Increase", style={'color': '#27ae60'}),
-                html.H2(id="after-metric", children=f"${stats['after_avg']:,.0f}"),
-                html.P("Average Daily Sales")
-            ], className="metric-card", style={'border-left-color': '#27ae60'}),
+                html.H4("🍬 Product"),
+                dcc.Dropdown(
+                    id='product-filter',
+                    options=[{'label': product.title(), 'value': product} for product in products],
+                    value=DEFAULT_PRODUCT,
+                    clearable=False
+                ),
+                html.H4("🌍 Regional Analysis Filter"),
+                dcc.RadioItems(
+                    id='region-filter',
+                    options=[
+                        {'label': 'All Regions', 'value': 'all'},
+                        {'label': 'North', 'value': 'north'},
+                        {'label': 'South', 'value': 'south'},
+                        {'label': 'East', 'value': 'east'},
+                        {'label': 'West', 'value': 'west'}
+                    ],
+                    value='all',
+                    className="radio-container",
+                    labelStyle={'display': 'inline-block', 'margin-right': '20px'},
+                    inputStyle={'margin-right': '8px'}
+                ),
+                html.H4("📅 Event"),
+                dcc.Dropdown(
+                    id='event-filter',
+                    options=event_options,
+                    value=event_options[0]['value'] if event_options else None,
+                    clearable=False
+                )
+            ], className="control-section"),
 
+            # Main Chart
             html.Div([
-                html.H4("📊 Performance Change",
-                        style={'color': '#e74c3c' if stats['percent_change'] < 0 else '#27ae60'}),
-                html.H2(id="change-metric", children=f"{stats['percent_change']:+.1f}%"),
-                html.P("Percentage Impact")
-            ], className="metric-card",
-                style={'border-left-color': '#e74c3c' if stats['percent_change'] < 0 else '#27ae60'})
-        ], className="metrics-container"),
-
-        # Region Filter Control
-        html.Div([
-            html.H4("🌍 Regional Analysis Filter"),
-            dcc.RadioItems(
-                id='region-filter',
-                options=[
-                    {'label': 'All Regions', 'value': 'all'},
-                    {'label': 'North', 'value': 'north'},
-                    {'label': 'South', 'value': 'south'},
-                    {'label': 'East', 'value': 'east'},
-                    {'label': 'West', 'value': 'west'}
-                ],
-                value='all',
-                className="radio-container",
-                labelStyle={'display': 'inline-block', 'margin-right': '20px'},
-                inputStyle={'margin-right': '8px'}
-            )
-        ], className="control-section"),
-
-        # Main Chart
-        html.Div([
-            dcc.Graph(id='sales-chart')
-        ], className="chart-container"),
+                dcc.Graph(id='sales-chart')
+            ], className="chart-container"),
 
-        # Regional Breakdown Chart
-        html.Div([
-            html.H3("📍 Sales Distribution by Region",
-                    style={'textAlign': 'center', 'color': '#2c3e50', 'margin-bottom': '20px'}),
-            dcc.Graph(
-                id='regional-chart',
-                figure=px.box(
-                    df,
-                    x='Region',
-                    y='Sales',
-                    title='',
-                    template='plotly_white',
-                    color='Region',
-                    color_discrete_sequence=['#4facfe', '#00f2fe', '#667eea', '#764ba2']
-                ).update_layout(
-                    height=400,
-                    plot_bgcolor='rgba(0,0,0,0)',
-                    paper_bgcolor='rgba(0,0,0,0)',
-                    font=dict(family='Inter', size=12, color='#2c3e50'),
-                    showlegend=False
+            # Regional Breakdown Chart
+            html.Div([
+                html.H3("📍 Sales Distribution by Region",
+                        style={'textAlign': 'center', 'color': '#2c3e50', 'margin-bottom': '20px'}),
+                dcc.Graph(
+                    id='regional-chart',
+                    figure=regional_figure
                 )
-            )
-        ], className="chart-container"),
+            ], className="chart-container"),
 
-        # Business Conclusion
-        html.Div([
-            html.H3("🎯 Strategic Business Insights"),
-            html.Div(id="conclusion-content", children=[
-                html.P([
-                    "📈 The data reveals that Pink Morsel sales were ",
-                    html.Strong(
-                        "SIGNIFICANTLY HIGHER" if stats['percent_change'] > 0 else "LOWER",
-                        className="pulse"
-                    ),
-                    " after the strategic price increase on January 15th, 2021."
-                ]),
-                html.P([
-                    "💰 Revenue performance improved by ",
-                    html.Strong(f"{stats['percent_change']:+.1f}%"),
-                    f" with daily averages rising from ${stats['before_avg']:,.0f} to ${stats['after_avg']:,.0f}."
-                ])
-            ], className="conclusion-content")
-        ], className="conclusion-section")
-
-    ], className="dashboard-container")
-], style={'min-height': '100vh'})
-
-
-# Callback for updating chart and metrics based on region selection
+            # Business Conclusion
+            html.Div([
+                html.H3("🎯 Strategic Business Insights"),
+                html.Div(id="conclusion-content", children=[
+                    html.P([
+                        "📈 The data reveals that Pink Morsel sales were ",
+                        html.Strong(
+                            "SIGNIFICANTLY HIGHER" if stats['percent_change'] > 0 else "LOWER",
+                            className="pulse"
+                        ),
+                        f" after the {event_text}."
+                    ]),
+                    html.P([
+                        "💰 Revenue performance improved by ",
+                        html.Strong(f"{stats['percent_change']:+.1f}%"),
+                        f" with daily averages rising from ${stats['before_avg']:,.0f} to ${stats['after_avg']:,.0f}."
+                    ])
+                ], className="conclusion-content")
+            ], className="conclusion-section"),
+
+            # Live refresh: the version of the data on screen, checked on every tick
+            dcc.Store(id='data-version', data=version),
+            dcc.Interval(id='live-refresh', interval=LIVE_REFRESH_MS or 60_000,
+                         disabled=not LIVE_REFRESH_MS)
+
+        ], className="dashboard-container")
+    ], style={'min-height': '100vh'})
+
+
+def build_page_layout():
+    version, data = sales_data.snapshot()
+    return build_layout(calculate_period_stats(data['event_stats']),
+                        create_regional_chart(data['box_stats']), data['events'],
+                        available_products(), version_token(DEFAULT_PRODUCT, version))
+
+
+# Built on the first page load and reused for every later one, until the data is reloaded
+page_layout = LazyDataset(build_page_layout)
+sales_data.on_reload(page_layout.reset)
+
+
+def serve_layout():
+    # Dash validates a layout function as soon as it is assigned; outside a request,
+    # hand it the page structure with placeholder numbers so nothing loads at import
+    if not has_request_context():
+        return build_layout(EMPTY_STATS, {})
+    return page_layout.get()
+
+
+# Define the app layout
+app.layout = serve_layout
+
+
+def version_token(product, version):
+    """What the browser keeps in the data-version store for the data on screen."""
+    return repr((product, version))
+
+
+# Checks for new data on every tick; the charts only update when the version changed
+@app.callback(
+    Output('data-version', 'data'),
+    Input('live-refresh', 'n_intervals'),
+    [State('product-filter', 'value'),
+     State('data-version', 'data')],
+    prevent_initial_call=True
+)
+def poll_data_version(_, selected_product, current_version):
+    product = resolve_product(selected_product)
+    version = version_token(product, product_dataset(product).snapshot()[0])
+    if version == current_version:
+        raise PreventUpdate
+    return version
+
+
+def visible_range(relayout_data):
+    """
+    Date range from a sales-chart relayoutData event: a (start, end) tuple, None
+    when the axis was reset, or False if the event did not touch the x-axis.
+    """
+    relayout_data = relayout_data or {}
+    if relayout_data.get('xaxis.autorange'):
+        return None
+    if 'xaxis.range[0]' in relayout_data and 'xaxis.range[1]' in relayout_data:
+        return relayout_data['xaxis.range[0]'], relayout_data['xaxis.range[1]']
+    if 'xaxis.range' in relayout_data:
+        return tuple(relayout_data['xaxis.range'])
+    return False
+
+
+# Callback for the sales chart: product/region/event selection plus zoom/pan on the chart itself
 @app.callback(
-    [Output('sales-chart', 'figure'),
+    Output('sales-chart', 'figure'),
+    [Input('region-filter', 'value'),
+     Input('event-filter', 'value'),
+     Input('product-filter', 'value'),
+     Input('sales-chart', 'relayoutData'),
+     Input('data-version', 'data')]
+)
+def update_sales_chart(selected_region, selected_event, selected_product, relayout_data, _=None):
+    date_range = None
+    if ctx.triggered_id == 'sales-chart':
+        date_range = visible_range(relayout_data)
+        if date_range is False:
+            raise PreventUpdate
+    elif ctx.triggered_id != 'region-filter':
+        # New data, event or product: the zoom is kept (see uirevision), so keep
+        # serving the range the user is looking at rather than the overview
+        date_range = visible_range(relayout_data) or None
+
+    product = resolve_product(selected_product)
+    # The key and the data come from one snapshot, so a concurrent reload cannot mix them
+    version, data = product_dataset(product).snapshot()
+    key = ('chart', product, selected_region, selected_event, date_range, version)
+    event = get_event(data['events'], selected_event)
+    return dashboard_cache.get_or_compute(
+        key, lambda: create_sales_chart(data['pyramid'], selected_region, date_range, event,
+                                        product).to_dict()
+    )
+
+
+# The regional chart ships with the page for Pink Morsel and only changes with the product
+@app.callback(
+    Output('regional-chart', 'figure'),
+    [Input('product-filter', 'value'),
+     Input('data-version', 'data')],
+    prevent_initial_call=True
+)
+def update_regional_chart(selected_product, _=None):
+    product = resolve_product(selected_product)
+    version, data = product_dataset(product).snapshot()
+    key = ('regional', product, version)
+    box_stats = data['box_stats']
+    return dashboard_cache.get_or_compute(key, lambda: create_regional_chart(box_stats).to_dict())
+
+
+# Callback for updating the headings and metrics for the selected product, region and event
+@app.callback(
+    [Output('page-title', 'children'),
+     Output('page-subtitle', 'children'),
+     Output('before-label', 'children'),
+     Output('after-label', 'children'),
      Output('before-metric', 'children'),
      Output('after-metric', 'children'),
      Output('change-metric', 'children'),
      Output('conclusion-content', 'children')],
-    [Input('region-filter', 'value')]
+    [Input('region-filter', 'value'),
+     Input('event-filter', 'value'),
+     Input('product-filter', 'value'),
+     Input('data-version', 'data')]
 )
-def update_dashboard(selected_region):
-    # Calculate new statistics for selected region
-    new_stats = calculate_period_stats(df, selected_region)
+def update_dashboard(selected_region, selected_event=None, selected_product=None, _=None):
+    # Serve repeated selections from the cache; a rewritten dataset changes the key
+    product = resolve_product(selected_product)
+    version, data = product_dataset(product).snapshot()
+    key = (product, selected_region, selected_event, version)
+    return dashboard_cache.get_or_compute(
+        key, lambda: build_dashboard_outputs(selected_region, selected_event, product, data)
+    )
+
 
-    # Update chart
-    new_figure = create_sales_chart(df, selected_region)
+def build_dashboard_outputs(selected_region, selected_event=None, product=DEFAULT_PRODUCT, data=None):
+    # Calculate new statistics for selected product, region and event
+    data = data or product_dataset(product).get()
+    event = get_event(data['events'], selected_event)
+    new_stats = calculate_period_stats(data['event_stats'], selected_region, event['id'])
 
     # Update metrics
     before_metric = f"${new_stats['before_avg']:,.0f}"
@@ -609,12 +1028,12 @@ def update_dashboard(selected_region):
     region_text = f" in the {selected_region.title()} region" if selected_region != 'all' else ""
     conclusion = [
         html.P([
-            f"📈 The data reveals that Pink Morsel sales{region_text} were ",
+            f"📈 The data reveals that {product.title()} sales{region_text} were ",
             html.Strong(
                 "SIGNIFICANTLY HIGHER" if new_stats['percent_change'] > 0 else "LOWER",
                 className="pulse"
             ),
-            " after the strategic price increase on January 15th, 2021."
+            f" after the {describe_event(event)}."
         ]),
         html.P([
             "💰 Revenue performance changed by ",
@@ -623,7 +1042,21 @@ def update_dashboard(selected_region):
         ])
     ]
 
-    return new_figure, before_metric, after_metric, change_metric, conclusion
+    return (*page_headings(event, product), before_metric, after_metric, change_metric, conclusion)
+
+
+def __getattr__(name):
+    # The data used to be loaded into module globals at import; keep those names working
+    if name in ('df', 'rollup', 'pyramid', 'box_stats', 'events', 'event_stats'):
+        return sales_data.get()[name]
+    if name == 'stats':
+        return calculate_period_stats(sales_data.get()['event_stats'])
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
+
+@server.route('/_dashboard_cache')
+def dashboard_cache_stats():
+    return jsonify(dashboard_cache.stats())
 
 
 # Run the app